@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -74,16 +75,29 @@ WSGI_APPLICATION = 'VisiOCR.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'visiocr',
-        'USER': 'root',
-        'PASSWORD': 'root',
-        'HOST': 'localhost',
-        'PORT': '3306',
+# VISIOCR_DB=sqlite runs against a local SQLite file for benchmarks and
+# tests; production uses MySQL. Connections are kept open between
+# requests and health-checked before reuse.
+if os.environ.get('VISIOCR_DB', 'mysql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('VISIOCR_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': 'visiocr',
+            'USER': 'root',
+            'PASSWORD': 'root',
+            'HOST': 'localhost',
+            'PORT': '3306',
+        }
+    }
+DATABASES['default']['CONN_MAX_AGE'] = 60
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
 
 
 # Password validation
@@ -126,3 +140,87 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# VisiOCR
+
+# Worker processes used for batch OCR; None uses one per CPU core.
+VISIOCR_OCR_PROCESSES = None
+
+# A batch may hold at most VISIOCR_BATCH_MAX_FILES images and
+# VISIOCR_BATCH_MAX_BYTES of uncompressed image data; each image is also
+# held to VISIOCR_MAX_UPLOAD_BYTES.
+VISIOCR_BATCH_MAX_FILES = 200
+VISIOCR_BATCH_MAX_BYTES = 200 * 1024 * 1024
+
+# extracted_data rows are written behind the request in bulk_create
+# batches of up to VISIOCR_DB_BATCH_SIZE rows, at most
+# VISIOCR_DB_FLUSH_INTERVAL seconds after the first queued row.
+# Set VISIOCR_DB_DURABLE_WRITES to wait for the commit before responding.
+VISIOCR_DB_BATCH_SIZE = 50
+VISIOCR_DB_FLUSH_INTERVAL = 0.5
+VISIOCR_DB_DURABLE_WRITES = False
+
+# Where visitors are stored. DjangoStore uses the ExtractedData model on
+# DATABASES['default']; 'ocrapp.storage.SQLiteStore' writes a local WAL
+# SQLite file (VISIOCR_STORAGE_OPTIONS = {'path': ...}) and needs no
+# database server. benchmarks/storage_bench.py compares the two.
+VISIOCR_STORAGE_BACKEND = 'ocrapp.storage.DjangoStore'
+VISIOCR_STORAGE_OPTIONS = {}
+
+# Look recognised PAN/Aadhaar numbers up in extracted_data and hand a
+# returning visitor their stored pass instead of registering them again.
+VISIOCR_RETURNING_LOOKUP = True
+
+# Read only the ID-number region first and look it up; the full name and
+# birth date extraction runs only for visitors who are not on record.
+VISIOCR_NUMBER_FIRST = True
+
+# OCR results are cached by the SHA-256 of the uploaded bytes: an in-memory
+# LRU of VISIOCR_CACHE_MEMORY_ITEMS entries in front of an on-disk tier
+# trimmed to VISIOCR_CACHE_DISK_BYTES. Set VISIOCR_CACHE_DIR to None to keep
+# the cache in memory only.
+VISIOCR_CACHE_DIR = BASE_DIR / 'cache' / 'ocr'
+VISIOCR_CACHE_MEMORY_ITEMS = 256
+VISIOCR_CACHE_DISK_BYTES = 64 * 1024 * 1024
+
+# Read name, birth date and ID number from per-card-type layout regions
+# before falling back to OCR of the whole card.
+VISIOCR_LAYOUT_OCR = True
+
+# Guess the card type from a colour thumbnail before OCR, so only that
+# type's layouts are read. Unrecognised images try every layout.
+VISIOCR_CLASSIFY = True
+
+# Preprocessing variants tried in order until one yields a name and a
+# valid birth date. The rung outcomes and latencies are on /metrics.
+VISIOCR_PREPROCESS_LADDER = ('otsu', 'adaptive', 'clahe', 'deskew', 'upscale')
+
+# Uploads are decoded straight to grayscale at a reduced scale and resized
+# so the card's long side is this many pixels (about 300 DPI for an ID-1 card).
+VISIOCR_OCR_TARGET_SIDE = 1012
+
+# Threads the async views hand OCR and PDF rendering to; None uses one per
+# CPU core.
+VISIOCR_ASYNC_WORKERS = None
+
+# Background OCR jobs (POST /jobs/, GET /jobs/<id>/) are queued in SQLite and
+# run by VISIOCR_JOB_WORKERS threads per process. Finished jobs are kept for
+# VISIOCR_JOB_RETENTION seconds so clients can keep polling.
+VISIOCR_JOBS_DB = BASE_DIR / 'jobs.sqlite3'
+VISIOCR_JOBS_SPOOL_DIR = BASE_DIR / 'cache' / 'jobs'
+VISIOCR_JOB_WORKERS = 2
+VISIOCR_JOB_RETENTION = 24 * 60 * 60
+VISIOCR_JOB_STALE_AFTER = 10 * 60
+
+# Uploads over VISIOCR_MAX_UPLOAD_BYTES are rejected before they are read,
+# and images over VISIOCR_MAX_IMAGE_PIXELS before they are decoded.
+VISIOCR_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+VISIOCR_MAX_IMAGE_PIXELS = 50 * 1000 * 1000
+
+# Visitor-pass PDFs are rendered once per registered visitor, right after
+# the upload, and served from this directory with an ETag; other download
+# requests are rendered in memory. Files older than VISIOCR_PASS_CACHE_TTL
+# seconds are removed.
+VISIOCR_PASS_CACHE_DIR = BASE_DIR / 'cache' / 'passes'
+VISIOCR_PASS_CACHE_TTL = 7 * 24 * 60 * 60
@@ -0,0 +1,131 @@
+"""Microbenchmark for ocrapp.fields.parse_text.
+
+Times the compiled single-pass extractor against the per-field regex
+version it replaced, over a corpus of Tesseract outputs for Aadhaar and
+PAN cards, and lists any documents where their results differ. The one
+expected difference is an Aadhaar number split across lines: the old
+version matched across the line break (typically pairing a PIN code with
+half of the number), the single-pass scanner does not.
+
+    python benchmarks/parse_text_bench.py [--corpus FILE] [--repeat N]
+"""
+import os
+import re
+import sys
+import json
+import timeit
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'images for project'))
+
+from ocrapp.fields import parse_text  # noqa: E402
+
+
+def legacy_parse_text(text):
+    name = None
+    birth_date = None
+    pan_number = None
+    aadhaar_number = None
+
+    all_text_list = re.split(r'[\n]', text)
+    text_list = list()
+
+    pan_match = re.search(r'[A-Z]{5}[0-9]{4}[A-Z]{1}', text)
+    if pan_match:
+        pan_number = pan_match.group(0).strip()
+
+    aadhar_match = re.search(r'\d{4}\s\d{4}\s\d{4}', text)
+    if aadhar_match:
+        aadhaar_number = aadhar_match.group(0).strip()
+
+    for i in all_text_list:
+        if re.match(r'^(\s)+$', i) or i == '':
+            continue
+        else:
+            text_list.append(i)
+
+    if "MALE" in text or "male" in text or "FEMALE" in text or "female" in text:
+        name, birth_date = legacy_extract_aadhar_info(text_list)
+    else:
+        name, birth_date = legacy_extract_pan_info(text)
+
+    return name, birth_date, pan_number, aadhaar_number
+
+
+def legacy_extract_aadhar_info(text_list):
+    aadhar_dob_pat = r'(YoB|YOB:|DOB:|DOB|AOB)'
+    date_ele = str()
+    index = None
+    for idx, i in enumerate(text_list):
+        if re.search(aadhar_dob_pat, i):
+            index = re.search(aadhar_dob_pat, i).span()[1]
+            date_ele = i
+            dob_idx = idx
+    if index is None:
+        return None, None
+    date_str = ''
+    for i in date_ele[index:]:
+        if re.match(r'\d', i):
+            date_str = date_str + i
+        elif re.match(r'/', i):
+            date_str = date_str + i
+    pattern = re.search(r'([A-Z][a-zA-Z\s]+)', text_list[dob_idx - 1])
+    name = pattern.group(0).strip() if pattern else None
+    return name, date_str
+
+
+def legacy_extract_pan_info(text):
+    pancard_name = None
+    name_patterns = [
+        r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s]+[A-Z]+[\s])',
+        r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s])',
+        r'(Name\s*\n[A-Z\s]+)'
+    ]
+    for pattern in name_patterns:
+        name_match_pan = re.search(pattern, text)
+        if name_match_pan:
+            matched_name = name_match_pan.group(1).strip().replace('\n', ' ')
+            pancard_name = re.sub(r'^Name\s+', '', matched_name)
+            break
+    dob_match_pan = re.search(r'(\d{2}/\d{2}/\d{4})', text, re.IGNORECASE)
+    birth_date = dob_match_pan.group(0).strip() if dob_match_pan else None
+    return pancard_name, birth_date
+
+
+def bench(func, corpus, repeat, number):
+    def run():
+        for text in corpus:
+            func(text)
+    best = min(timeit.repeat(run, repeat=repeat, number=number))
+    return best / (number * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=os.path.join(HERE, 'ocr_outputs.json'))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+
+    differences = []
+    for text in corpus:
+        new, old = parse_text(text), legacy_parse_text(text)
+        if new != old:
+            differences.append({'text': text, 'compiled': new, 'legacy': old})
+    legacy = bench(legacy_parse_text, corpus, args.repeat, args.number)
+    compiled = bench(parse_text, corpus, args.repeat, args.number)
+    print(json.dumps({
+        'documents': len(corpus),
+        'legacy_us_per_doc': round(legacy * 1e6, 2),
+        'compiled_us_per_doc': round(compiled * 1e6, 2),
+        'speedup': round(legacy / compiled, 2),
+        'differences': differences,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Stage-level benchmark for the OCR pipeline.
+
+Runs every image in the corpus through the same stages the upload view
+does and times each one separately: decode (decode_normalized), classify
+(classify_document), preprocess (preprocess_image), ocr (image_to_string
+on the preprocessed image), parse (parse_text), extract (the preprocessing
+ladder with layout OCR and the full-frame fallback, as extract_info runs
+it), qr (create_qr_code, memoization bypassed) and pdf (render_pass_pdf).
+Prints one JSON document with p50/p95/p99 latency
+and throughput per stage plus the process's peak RSS, so runs on two
+commits can be diffed directly.
+
+The default corpus is the sample cards shipped in the repository.
+
+    python benchmarks/pipeline_bench.py [IMAGE ...] [--repeat N] [--stages decode,ocr] [--output FILE]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+APP_DIR = os.path.join(ROOT, 'images for project', 'ocrapp')
+sys.path.insert(0, os.path.join(ROOT, 'images for project'))
+
+DEFAULT_CORPUS = [
+    os.path.join(ROOT, 'aadhar 1.jpeg'),
+    os.path.join(ROOT, 'pan1.png'),
+    os.path.join(ROOT, 'images for project', 'pass 1.jpeg'),
+]
+STAGES = ('decode', 'classify', 'preprocess', 'ocr', 'parse', 'extract', 'qr', 'pdf')
+
+
+def configure_django(template_dir):
+    # Only the template engine is needed for the pdf stage; the project
+    # settings would load the whole app and need its database configured.
+    import django
+    from django.conf import settings
+    settings.configure(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [template_dir],
+    }])
+    django.setup()
+
+
+def stage_template_dir():
+    # The views load 'ocr_app/pdf_template.html'; stage the app's template
+    # under that name so the benchmark renders the same file.
+    template_dir = tempfile.mkdtemp(prefix='visiocr-bench-')
+    os.makedirs(os.path.join(template_dir, 'ocr_app'))
+    shutil.copy(os.path.join(APP_DIR, 'template', 'pdf_template.html'), os.path.join(template_dir, 'ocr_app', 'pdf_template.html'))
+    return template_dir
+
+
+def percentile(samples, pct):
+    # Nearest-rank, so every reported value is an observed timing.
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples):
+    total = sum(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': round(total / len(samples) * 1e3, 3),
+        'p50_ms': round(percentile(samples, 50) * 1e3, 3),
+        'p95_ms': round(percentile(samples, 95) * 1e3, 3),
+        'p99_ms': round(percentile(samples, 99) * 1e3, 3),
+        'max_ms': round(max(samples) * 1e3, 3),
+        'throughput_per_s': round(len(samples) / total, 2) if total else None,
+    }
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(timings, stage, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage].append(time.perf_counter() - start)
+    return result
+
+
+def extract_fields(image, doc_type):
+    # extract_info without the project settings: every ladder rung tries
+    # the layout crops first and full-frame OCR when no layout fits.
+    from ocrapp.ladder import run_ladder
+    from ocrapp.layouts import extract_by_layout
+    from ocrapp.ocr_engine import image_to_string
+    from ocrapp.fields import parse_text
+
+    def read_fields(processed_image):
+        fields = extract_by_layout(processed_image, doc_type)
+        if fields is not None:
+            return fields['name'], fields['birth_date'], fields.get('pan_number'), fields.get('aadhaar_number')
+        return parse_text(image_to_string(processed_image))
+    return run_ladder(image, read_fields)[0]
+
+
+def run_document(data, stages, timings, target_side):
+    from ocrapp.normalize import decode_normalized, preprocess_image
+    from ocrapp.classifier import classify_document
+    from ocrapp.ocr_engine import image_to_string
+    from ocrapp.fields import parse_text
+
+    # Later stages need the earlier results, so they always run; only the
+    # requested stages are recorded.
+    record = {stage: (timings if stage in stages else {stage: []}) for stage in STAGES}
+    image = timed(record['decode'], 'decode', decode_normalized, data, target_side)
+    if image is None:
+        raise ValueError('image could not be decoded')
+    doc_type = None
+    if stages & {'classify', 'extract'}:
+        doc_type = timed(record['classify'], 'classify', classify_document, data)
+    processed = timed(record['preprocess'], 'preprocess', preprocess_image, image)
+    if 'extract' in stages:
+        timed(timings, 'extract', extract_fields, image, doc_type)
+    if not stages & {'ocr', 'parse', 'qr', 'pdf'}:
+        return
+    text = timed(record['ocr'], 'ocr', image_to_string, processed)
+    name, birth_date, pan_number, aadhaar_number = timed(record['parse'], 'parse', parse_text, text)
+    if 'qr' in stages:
+        from ocrapp.passes import create_qr_code
+        timed(timings, 'qr', create_qr_code.__wrapped__, f"Name: {name}, Birth Date: {birth_date}, PAN: {pan_number}, Aadhaar: {aadhaar_number}")
+    if 'pdf' in stages:
+        from ocrapp.passes import pass_context, render_pass_pdf
+        context = pass_context({'name': name, 'birth_date': birth_date, 'age': 30, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number})
+        timed(timings, 'pdf', render_pass_pdf, context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='*', help='images to run (default: the bundled sample cards)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed passes over the corpus')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed passes before measuring')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated subset of ' + ','.join(STAGES))
+    parser.add_argument('--target-side', type=int, default=None, help='decode target side (default: OCR_TARGET_SIDE)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    stages = set(filter(None, args.stages.split(',')))
+    unknown = stages - set(STAGES)
+    if unknown:
+        parser.error('unknown stages: ' + ', '.join(sorted(unknown)))
+
+    template_dir = None
+    if 'pdf' in stages:
+        template_dir = stage_template_dir()
+        configure_django(template_dir)
+
+    from ocrapp.normalize import OCR_TARGET_SIDE
+    from ocrapp.ocr_engine import warm_up
+    target_side = args.target_side or OCR_TARGET_SIDE
+
+    corpus = []
+    for path in args.images or DEFAULT_CORPUS:
+        with open(path, 'rb') as f:
+            corpus.append((path, f.read()))
+
+    try:
+        if stages & {'ocr', 'parse', 'extract', 'qr', 'pdf'}:
+            warm_up()
+        discard = {stage: [] for stage in STAGES}
+        for _ in range(args.warmup):
+            for _, data in corpus:
+                run_document(data, stages, discard, target_side)
+
+        timings = {stage: [] for stage in STAGES}
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, data in corpus:
+                run_document(data, stages, timings, target_side)
+        elapsed = time.perf_counter() - start
+    finally:
+        if template_dir is not None:
+            shutil.rmtree(template_dir, ignore_errors=True)
+
+    documents = len(corpus) * args.repeat
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': [os.path.relpath(path, ROOT) for path, _ in corpus],
+        'repeat': args.repeat,
+        'target_side': target_side,
+        'documents': documents,
+        'elapsed_s': round(elapsed, 3),
+        'documents_per_s': round(documents / elapsed, 2) if elapsed else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'stages': {stage: summarize(timings[stage]) for stage in STAGES if timings[stage]},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
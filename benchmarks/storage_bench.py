@@ -0,0 +1,166 @@
+"""Throughput benchmark for the visitor storage backends.
+
+Writes synthetic visitors through each backend's insert_many in writer
+sized batches from several threads, then looks a sample of them up by
+PAN or Aadhaar number, the way the batch writer and the returning
+visitor lookup use the store. A share of the rows repeat an earlier
+visitor so the upsert path is exercised. Prints rows/s, lookups/s and
+p50/p95/p99 latencies per backend as JSON.
+
+By default Django runs against a scratch SQLite database, so
+'django' (DjangoStore, the ORM) and 'sqlite' (SQLiteStore, raw sqlite3
+in WAL mode) are compared on one machine with no server. --settings
+points Django at another settings module instead, e.g. a MySQL one;
+use a scratch database, the benchmark writes to extracted_data.
+
+    python benchmarks/storage_bench.py [--backends django,sqlite] [--rows N] [--batch-size N] [--threads N] [--settings MODULE]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'images for project'))
+
+from pipeline_bench import summarize, peak_rss_bytes, git_revision  # noqa: E402
+
+BACKENDS = {
+    'django': 'ocrapp.storage.DjangoStore',
+    'sqlite': 'ocrapp.storage.SQLiteStore',
+}
+# Roughly the size of the QR PNG stored with every visitor.
+QR_CODE_IMAGE = b'\x89PNG' + bytes(range(256)) * 3
+
+
+def configure_django(settings_module, scratch_dir):
+    import django
+    from django.conf import settings
+    if settings_module:
+        os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+        django.setup()
+        return
+    settings.configure(
+        BASE_DIR=scratch_dir,
+        INSTALLED_APPS=['ocrapp'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(scratch_dir, 'db.sqlite3')}},
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+    )
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', 'ocrapp', verbosity=0)
+
+
+def pan_number(i):
+    letters = ''
+    for _ in range(5):
+        i, digit = divmod(i, 26)
+        letters += chr(ord('A') + digit)
+    return '%s%04d%s' % (letters, i % 10000, 'P')
+
+
+def visitor_rows(count, returning, seed):
+    # Even visitors carry a PAN, odd ones an Aadhaar number; a returning
+    # visitor reuses an earlier index and therefore its ID number.
+    rng = random.Random(seed)
+    rows = []
+    numbers = []
+    for i in range(count):
+        index = rng.randrange(i) if i and rng.random() < returning else i
+        birth_date = date(1960, 1, 1) + timedelta(days=index * 37 % 15000)
+        if index % 2 == 0:
+            number = (pan_number(index), None)
+        else:
+            digits = '%012d' % (100000000000 + index)
+            number = (None, ' '.join(digits[j:j + 4] for j in range(0, 12, 4)))
+        rows.append(('Visitor %d' % index, birth_date, number[0], number[1], QR_CODE_IMAGE, (date.today() - birth_date).days // 365))
+        numbers.append(number)
+    return rows, numbers
+
+
+def timed_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run_backend(store, rows, numbers, batch_size, threads, lookups, seed):
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        writes = list(executor.map(lambda batch: timed_call(store.insert_many, batch), batches))
+        write_elapsed = time.perf_counter() - start
+
+        sample = random.Random(seed).choices(numbers, k=lookups)
+        start = time.perf_counter()
+        reads = list(executor.map(lambda number: timed_call(store.lookup_visitor, *number), sample))
+        read_elapsed = time.perf_counter() - start
+
+    return {
+        'rows': len(rows),
+        'batches': len(batches),
+        'failed_batches': sum(1 for _, ok in writes if not ok),
+        'rows_per_s': round(len(rows) / write_elapsed, 1) if write_elapsed else None,
+        'batch_latency': summarize([seconds for seconds, _ in writes]),
+        'lookups': len(sample),
+        'lookup_misses': sum(1 for _, visitor in reads if visitor is None),
+        'lookups_per_s': round(len(sample) / read_elapsed, 1) if read_elapsed else None,
+        'lookup_latency': summarize([seconds for seconds, _ in reads]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='comma-separated names (%s) or dotted paths' % ', '.join(BACKENDS))
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=50, help='rows per insert_many call, like VISIOCR_DB_BATCH_SIZE')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=5000)
+    parser.add_argument('--returning', type=float, default=0.3, help='share of rows that repeat an earlier visitor')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--settings', help='Django settings module to use instead of a scratch SQLite database')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='visiocr-storage-bench-')
+    try:
+        configure_django(args.settings, scratch_dir)
+        from django.utils.module_loading import import_string
+
+        rows, numbers = visitor_rows(args.rows, args.returning, args.seed)
+        results = {}
+        for name in filter(None, args.backends.split(',')):
+            backend = import_string(BACKENDS.get(name, name))
+            options = {'path': os.path.join(scratch_dir, 'visitors-%s.sqlite3' % name)} if backend.__name__ == 'SQLiteStore' else {}
+            results[name] = run_backend(backend(**options), rows, numbers, args.batch_size, args.threads, args.lookups, args.seed)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report = {
+        'revision': git_revision(),
+        'settings': args.settings or 'scratch sqlite',
+        'rows': args.rows,
+        'batch_size': args.batch_size,
+        'threads': args.threads,
+        'returning': args.returning,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'backends': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
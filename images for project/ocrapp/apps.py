@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OcrappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ocrapp'
+
+    def ready(self):
+        from .ocr_engine import warm_up
+        warm_up()
@@ -0,0 +1,138 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=None, memory_items=256, disk_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_used = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error("Error while reading cached OCR result %s: %s", path, e)
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logging.error("Error while caching OCR result %s: %s", path, e)
+            return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk()[1]
+            else:
+                self._disk_used += size
+            if self._disk_used > self.disk_bytes:
+                self._evict()
+
+    def _scan_disk(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def _evict(self):
+        # Trim to 90% of the budget, least recently used first, so a full
+        # cache does not rescan the directory on every write.
+        entries, total = self._scan_disk()
+        target = self.disk_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_used = total
+        logging.debug("OCR result cache trimmed to %d bytes", total)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                directory=getattr(settings, 'VISIOCR_CACHE_DIR', None),
+                memory_items=getattr(settings, 'VISIOCR_CACHE_MEMORY_ITEMS', 256),
+                disk_bytes=getattr(settings, 'VISIOCR_CACHE_DISK_BYTES', 64 * 1024 * 1024),
+            )
+        return _cache
@@ -0,0 +1,83 @@
+import logging
+
+import cv2
+import numpy as np
+
+from .normalize import image_size
+
+# Long side of the thumbnail the classifier looks at. Colour layout is all
+# it needs, so JPEGs are decoded at 1/8 scale straight from the DCT data.
+THUMBNAIL_SIDE = 160
+REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Landscape captures only; the layouts assume a card the right way up.
+CARD_ASPECT_RANGE = (1.2, 2.0)
+
+# OpenCV hue runs 0-179. Aadhaar cards are white with the saffron and green
+# "GOVERNMENT OF INDIA" bands across the top; PAN cards have a pale blue
+# background over most of the card.
+AADHAAR_ORANGE_HUES = (5, 25)
+AADHAAR_GREEN_HUES = (40, 85)
+AADHAAR_BAND_HEIGHT = 0.35
+AADHAAR_BAND_MIN = 0.005
+BAND_MIN_SATURATION = 80
+PAN_BACKGROUND_HUES = (80, 115)
+PAN_BACKGROUND_MIN = 0.35
+PAN_MIN_SATURATION = 20
+
+
+def thumbnail(data):
+    size = image_size(data)
+    # Without a size the upload could be any number of pixels, so it is
+    # decoded at the smallest scale rather than in full.
+    flag = REDUCED_COLOR_FLAGS[0][1]
+    if size:
+        flag = cv2.IMREAD_COLOR
+        for factor, reduced_flag in REDUCED_COLOR_FLAGS:
+            if max(size) // factor >= THUMBNAIL_SIDE:
+                flag = reduced_flag
+                break
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image is None:
+        return None
+    scale = THUMBNAIL_SIDE / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def hue_share(hsv, hues, min_saturation):
+    # Share of all pixels that are saturated, not dark, and in the hue range.
+    mask = cv2.inRange(hsv, (0, min_saturation, 60), (179, 255, 255))
+    hist = cv2.calcHist([hsv], [0], mask, [180], [0, 180]).ravel()
+    return hist[hues[0]:hues[1] + 1].sum() / (hsv.shape[0] * hsv.shape[1])
+
+
+def classify_image(image):
+    height, width = image.shape[:2]
+    if not CARD_ASPECT_RANGE[0] <= width / height <= CARD_ASPECT_RANGE[1]:
+        return None
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    band = hsv[:max(1, int(height * AADHAAR_BAND_HEIGHT))]
+    tricolour = (hue_share(band, AADHAAR_ORANGE_HUES, BAND_MIN_SATURATION) >= AADHAAR_BAND_MIN
+                 and hue_share(band, AADHAAR_GREEN_HUES, BAND_MIN_SATURATION) >= AADHAAR_BAND_MIN)
+    blue = hue_share(hsv, PAN_BACKGROUND_HUES, PAN_MIN_SATURATION) >= PAN_BACKGROUND_MIN
+    # Ambiguous images go down the generic path rather than a wrong one.
+    if tricolour and not blue:
+        return 'aadhaar'
+    if blue and not tricolour:
+        return 'pan'
+    return None
+
+
+def classify_document(data):
+    image = thumbnail(data)
+    if image is None:
+        return None
+    doc_type = classify_image(image)
+    logging.debug("Document classified as %s", doc_type or 'unknown')
+    return doc_type
@@ -0,0 +1,41 @@
+import threading
+import logging
+from django.conf import settings
+
+from .writer import BatchWriter, register
+from .metrics import stage_timer
+from .storage import get_store
+from .fields import birth_date_value
+
+_writer = None
+_lock = threading.Lock()
+
+
+def insert_many(rows):
+    with stage_timer('db'):
+        return get_store().insert_many(rows)
+
+
+def get_writer():
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = register(BatchWriter(
+                insert_many,
+                batch_size=getattr(settings, 'VISIOCR_DB_BATCH_SIZE', 50),
+                flush_interval=getattr(settings, 'VISIOCR_DB_FLUSH_INTERVAL', 0.5),
+                name='extracted-data-writer',
+            ))
+        return _writer
+
+
+def writer_depth():
+    return _writer.depth() if _writer is not None else 0
+
+
+def insert_data(name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age, durable=None):
+    birth_date = birth_date_value(birth_date)
+    if durable is None:
+        durable = getattr(settings, 'VISIOCR_DB_DURABLE_WRITES', False)
+    logging.debug("Queued record: Name: %s, Birth Date: %s, PAN Number: %s, Aadhaar Number: %s", name, birth_date, pan_number, aadhaar_number)
+    return get_writer().submit((name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age), durable=durable)
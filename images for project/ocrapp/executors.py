@@ -0,0 +1,41 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+
+_process_pool = None
+_thread_pool = None
+_lock = threading.Lock()
+
+
+def process_context():
+    # Forking the server would copy its request threads' locks and its
+    # database connections into the workers, so they start from a fresh
+    # interpreter and set Django up themselves.
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # Preloading also hands the server's sys.path on to the workers.
+    context.set_forkserver_preload(['django'])
+    return context
+
+
+def get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            workers = getattr(settings, 'VISIOCR_OCR_PROCESSES', None) or os.cpu_count() or 1
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=django.setup)
+        return _process_pool
+
+
+def get_thread_pool():
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            workers = getattr(settings, 'VISIOCR_ASYNC_WORKERS', None) or os.cpu_count() or 1
+            _thread_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='visiocr')
+        return _thread_pool
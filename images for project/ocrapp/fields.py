@@ -0,0 +1,158 @@
+import re
+from datetime import datetime
+
+PAN_NUMBER_RE = re.compile(r'[A-Z]{5}[0-9]{4}[A-Z]')
+AADHAAR_NUMBER_RE = re.compile(r'\d{4}\s\d{4}\s\d{4}')
+DATE_RE = re.compile(r'\d{2}/\d{2}/\d{4}')
+DOB_LABEL_RE = re.compile(r'(YoB|YOB:|DOB:|DOB|AOB)')
+DATE_CHARS_RE = re.compile(r'[\d/]+')
+NAME_RE = re.compile(r'([A-Z][a-zA-Z\s]+)')
+NAME_PREFIX_RE = re.compile(r'^Name\s+')
+PAN_NAME_RES = (
+    re.compile(r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s]+[A-Z]+[\s])'),
+    re.compile(r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s])'),
+    re.compile(r'(Name\s*\n[A-Z\s]+)'),
+)
+
+# Every field is located in one scan of the OCR text. Number and date
+# patterns may not cross a line break, since Tesseract puts each printed
+# field on its own line. The leading lookahead lets the scanner skip
+# positions no alternative can start at without trying each branch.
+FIELD_SCANNER = re.compile(
+    r'(?=[A-Z\d])(?:'
+    r'(?P<pan_number>[A-Z]{5}[0-9]{4}[A-Z])'
+    r'|(?P<aadhaar_number>\d{4}[^\S\n]\d{4}[^\S\n]\d{4})'
+    r'|(?P<date>\d{2}/\d{2}/\d{4})'
+    r'|(?P<dob_label>YoB|YOB:|DOB:|DOB|AOB)'
+    r')'
+)
+
+_NOT_SCANNED = object()
+
+
+def birth_date_value(birth_date):
+    # Cards that print only the year of birth (YoB) are taken as 1 January
+    # of that year. Raises ValueError for anything else.
+    for date_format in ("%d/%m/%Y", "%Y"):
+        try:
+            return datetime.strptime(birth_date, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError("Unrecognised birth date %r" % birth_date)
+
+# Verhoeff tables. The last digit of an Aadhaar number is a Verhoeff check
+# digit, which catches every single misread digit and swapped pair.
+VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+
+def valid_aadhaar(number):
+    # Aadhaar numbers never start with 0 or 1.
+    digits = ''.join(number.split())
+    if len(digits) != 12 or not digits.isdigit() or digits[0] in '01':
+        return False
+    check = 0
+    for i, digit in enumerate(reversed(digits)):
+        check = VERHOEFF_D[check][VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+
+def scan_fields(text):
+    found = {'pan_number': None, 'aadhaar_number': None, 'date': None, 'dob_label': None}
+    for match in FIELD_SCANNER.finditer(text):
+        field = match.lastgroup
+        # The last DOB label wins, as on cards that print both DOB and YoB;
+        # every other field keeps its first match.
+        if found[field] is None or field == 'dob_label':
+            found[field] = match.start()
+    return found
+
+
+def line_bounds(text, pos):
+    start = text.rfind('\n', 0, pos) + 1
+    end = text.find('\n', pos)
+    return start, len(text) if end == -1 else end
+
+
+def previous_text_line(text, line_start):
+    end = line_start - 1
+    while end > 0:
+        start = text.rfind('\n', 0, end) + 1
+        line = text[start:end]
+        if line and not line.isspace():
+            return line
+        end = start - 1
+    # Nothing above the DOB line: mirror text_list[-1] on a label in the first line.
+    lines = [line for line in text.split('\n') if line and not line.isspace()]
+    return lines[-1]
+
+
+def parse_text(text):
+    found = scan_fields(text)
+    values = {}
+    for field in ('pan_number', 'aadhaar_number', 'date'):
+        pos = found[field]
+        values[field] = FIELD_SCANNER.match(text, pos).group(0).strip() if pos is not None else None
+
+    # 'FEMALE' and 'female' contain these, so two substring checks cover
+    # all four spellings.
+    if 'MALE' in text or 'male' in text:
+        name, birth_date = None, None
+        if found['dob_label'] is not None:
+            start, end = line_bounds(text, found['dob_label'])
+            label = DOB_LABEL_RE.search(text, start, end)
+            birth_date = ''.join(DATE_CHARS_RE.findall(text, label.end(), end))
+            match = NAME_RE.search(previous_text_line(text, start))
+            name = match.group(0).strip() if match else None
+    else:
+        name, birth_date = extract_pan_info(text, values['date'])
+    return name, birth_date, values['pan_number'], values['aadhaar_number']
+
+
+def extract_aadhar_info(text_list):
+    dob = None
+    for idx, line in enumerate(text_list):
+        label = DOB_LABEL_RE.search(line)
+        if label:
+            dob = (idx, label.end())
+    if dob is None:
+        return None, None
+    dob_idx, index = dob
+    user_dob = ''.join(DATE_CHARS_RE.findall(text_list[dob_idx], index))
+    match = NAME_RE.search(text_list[dob_idx - 1])
+    name = match.group(0).strip() if match else None
+    return name, user_dob
+
+
+def extract_pan_info(text, birth_date=_NOT_SCANNED):
+    pancard_name = None
+    for pattern in PAN_NAME_RES:
+        match = pattern.search(text)
+        if match:
+            matched_name = match.group(1).strip().replace('\n', ' ')
+            pancard_name = NAME_PREFIX_RE.sub('', matched_name)
+            break
+    if birth_date is _NOT_SCANNED:
+        match = DATE_RE.search(text)
+        birth_date = match.group(0).strip() if match else None
+    return pancard_name, birth_date
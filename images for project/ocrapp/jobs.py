@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .cache import content_key
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, content_key TEXT NOT NULL, filename TEXT, status TEXT NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_content_key ON jobs (content_key)",
+)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue:
+    def __init__(self, path, spool_dir, handler, workers=2, retention=24 * 60 * 60, stale_after=10 * 60):
+        self.path = str(path)
+        self.spool_dir = str(spool_dir)
+        self.handler = handler
+        self.workers = workers
+        self.retention = retention
+        self._wakeup = threading.Condition()
+        self._threads = []
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with self._connection() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            # Jobs stuck running this long belong to a worker process that died.
+            connection.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?", (QUEUED, time.time(), RUNNING, time.time() - stale_after))
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _payload_path(self, job_id):
+        return os.path.join(self.spool_dir, job_id)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name='ocr-job-worker-%d' % i, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, filename, data):
+        key = content_key(data)
+        with self._connection() as connection:
+            # A client retrying the same upload gets the job it already has.
+            row = connection.execute("SELECT * FROM jobs WHERE content_key = ? AND status != ? ORDER BY created_at DESC LIMIT 1", (key, FAILED)).fetchone()
+            if row is not None:
+                return self._as_dict(row)
+            job_id = uuid.uuid4().hex
+            with open(self._payload_path(job_id), 'wb') as f:
+                f.write(data)
+            now = time.time()
+            connection.execute("INSERT INTO jobs (id, content_key, filename, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", (job_id, key, filename, QUEUED, now, now))
+        with self._wakeup:
+            self._wakeup.notify()
+        logging.debug("Queued OCR job %s for %s", job_id, filename)
+        return {'id': job_id, 'filename': filename, 'status': QUEUED}
+
+    def get(self, job_id):
+        with self._connection() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row) if row is not None else None
+
+    def depth(self):
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchone()[0]
+
+    def _as_dict(self, row):
+        job = {'id': row['id'], 'filename': row['filename'], 'status': row['status']}
+        if row['result'] is not None:
+            job['result'] = json.loads(row['result'])
+        if row['error'] is not None:
+            job['error'] = row['error']
+        return job
+
+    def _claim(self):
+        connection = self._connect()
+        try:
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, time.time(), row['id']))
+            connection.execute("COMMIT")
+            return row['id'] if row is not None else None
+        finally:
+            connection.close()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connection() as connection:
+            connection.execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?", (status, json.dumps(result) if result is not None else None, error, time.time(), job_id))
+        try:
+            os.remove(self._payload_path(job_id))
+        except OSError:
+            pass
+
+    def _prune(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, time.time() - self.retention))
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._claim()
+            except sqlite3.Error as e:
+                logging.error("Error while claiming an OCR job: %s", e)
+                job_id = None
+            if job_id is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5)
+                continue
+            try:
+                with open(self._payload_path(job_id), 'rb') as f:
+                    data = f.read()
+                outcome = {'status': DONE, 'result': self.handler(data)}
+            except Exception as e:
+                logging.error("OCR job %s failed: %s", job_id, e)
+                outcome = {'status': FAILED, 'error': str(e)}
+            try:
+                self._finish(job_id, **outcome)
+            except sqlite3.Error as e:
+                # Left running; the next start requeues it once stale.
+                logging.error("Error while finishing OCR job %s: %s", job_id, e)
+                continue
+            logging.debug("OCR job %s %s", job_id, outcome['status'])
+            try:
+                self._prune()
+            except sqlite3.Error as e:
+                logging.error("Error while pruning OCR jobs: %s", e)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(handler):
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                path=getattr(settings, 'VISIOCR_JOBS_DB', settings.BASE_DIR / 'jobs.sqlite3'),
+                spool_dir=getattr(settings, 'VISIOCR_JOBS_SPOOL_DIR', settings.BASE_DIR / 'cache' / 'jobs'),
+                handler=handler,
+                workers=getattr(settings, 'VISIOCR_JOB_WORKERS', 2),
+                retention=getattr(settings, 'VISIOCR_JOB_RETENTION', 24 * 60 * 60),
+                stale_after=getattr(settings, 'VISIOCR_JOB_STALE_AFTER', 10 * 60),
+            )
+            _queue.start()
+        return _queue
+
+
+def queue_depth():
+    return _queue.depth() if _queue is not None else 0
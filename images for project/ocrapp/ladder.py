@@ -0,0 +1,131 @@
+import time
+import logging
+import cv2
+import numpy as np
+
+from .normalize import preprocess_image
+from .fields import birth_date_value
+from .metrics import register, Counter, Histogram, stage_timer
+
+# Cheapest first; each rung is only tried when the one before it did not
+# produce a usable name and birth date.
+DEFAULT_LADDER = ('otsu', 'adaptive', 'clahe', 'deskew', 'upscale')
+
+ADAPTIVE_BLOCK_SIZE = 31
+ADAPTIVE_C = 15
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILE_GRID = (8, 8)
+UPSCALE_FACTOR = 2
+
+# Skew is searched on a small copy by rotating it and keeping the angle
+# whose row profile is sharpest, i.e. where text lines line up with rows.
+SKEW_SEARCH_WIDTH = 400
+SKEW_MAX_ANGLE = 10.0
+SKEW_STEP = 0.5
+SKEW_MIN_ANGLE = 0.5
+
+LADDER_SECONDS = register(Histogram('visiocr_ladder_seconds', 'Time spent on each preprocessing ladder rung, OCR included.', labels=('variant',)))
+LADDER_ATTEMPTS = register(Counter('visiocr_ladder_attempts_total', 'Preprocessing ladder rungs tried, by outcome.', labels=('variant', 'outcome')))
+
+
+def to_gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def adaptive_variant(image):
+    gray = cv2.medianBlur(to_gray(image), 3)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, ADAPTIVE_BLOCK_SIZE, ADAPTIVE_C)
+
+
+def clahe_variant(image):
+    clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+    return preprocess_image(clahe.apply(to_gray(image)))
+
+
+def rotate(image, angle, border_value=255):
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=border_value)
+
+
+def skew_angle(gray):
+    scale = SKEW_SEARCH_WIDTH / gray.shape[1]
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-SKEW_MAX_ANGLE, SKEW_MAX_ANGLE + SKEW_STEP / 2, SKEW_STEP):
+        score = np.var(rotate(ink, angle, border_value=0).sum(axis=1, dtype=np.int64))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def deskew_variant(image):
+    gray = to_gray(image)
+    angle = skew_angle(gray)
+    if abs(angle) >= SKEW_MIN_ANGLE:
+        gray = rotate(gray, angle, border_value=int(np.median(gray)))
+    return preprocess_image(gray)
+
+
+def upscale_variant(image):
+    gray = cv2.resize(to_gray(image), None, fx=UPSCALE_FACTOR, fy=UPSCALE_FACTOR, interpolation=cv2.INTER_CUBIC)
+    return preprocess_image(gray)
+
+
+VARIANTS = {
+    'otsu': preprocess_image,
+    'adaptive': adaptive_variant,
+    'clahe': clahe_variant,
+    'deskew': deskew_variant,
+    'upscale': upscale_variant,
+}
+
+
+def valid_fields(fields):
+    # A name and a well-formed birth date. Cards that print only the year
+    # of birth (YoB) stop here too; no costlier rung can read a full date
+    # the card does not have.
+    name, birth_date = fields[0], fields[1]
+    if not name or not birth_date:
+        return False
+    try:
+        birth_date_value(birth_date)
+    except ValueError:
+        return False
+    return True
+
+
+def field_count(fields):
+    return sum(1 for value in fields if value)
+
+
+def run_ladder(image, read_fields, variants=DEFAULT_LADDER):
+    # Returns the fields of the first variant that validates, or else the
+    # most complete result seen so the caller can still report it, and
+    # whether any variant ran without raising. When none did (Tesseract
+    # missing, say) the empty fields say nothing about the image itself.
+    best = None
+    completed = False
+    for variant in variants:
+        start = time.perf_counter()
+        try:
+            with stage_timer('preprocess'):
+                processed_image = VARIANTS[variant](image)
+            fields = read_fields(processed_image)
+        except Exception as e:
+            LADDER_ATTEMPTS.inc(variant=variant, outcome='error')
+            logging.error("Preprocessing variant %s failed: %s", variant, e)
+            continue
+        finally:
+            LADDER_SECONDS.observe(time.perf_counter() - start, variant=variant)
+        completed = True
+        if valid_fields(fields):
+            LADDER_ATTEMPTS.inc(variant=variant, outcome='valid')
+            logging.debug("Fields read after the %s preprocessing variant", variant)
+            return fields, completed
+        LADDER_ATTEMPTS.inc(variant=variant, outcome='invalid')
+        if best is None or field_count(fields) > field_count(best):
+            best = fields
+    return (best if best is not None else (None, None, None, None)), completed
@@ -0,0 +1,212 @@
+import re
+import logging
+
+from .ocr_engine import image_to_string
+from .fields import PAN_NUMBER_RE, DOB_LABEL_RE, DATE_RE, NAME_RE
+
+# Tesseract page segmentation mode 7: treat the crop as a single text line.
+PSM_SINGLE_LINE = 7
+
+# Width of an ID-1 card (Aadhaar and PAN are both ID-1), used to tell
+# Tesseract the real resolution of a crop instead of its 70 dpi guess.
+CARD_WIDTH_INCHES = 85.6 / 25.4
+
+DIGITS = '0123456789'
+UPPERCASE = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Tesseract settings per field crop. The whitelist stops the recognizer
+# from considering characters the field cannot contain, which is both
+# faster and removes the usual O/0, I/1 and S/5 confusions. A 'dpi' of
+# None means the resolution is worked out from the card width.
+FIELD_PROFILES = {
+    'aadhaar_number': {'psm': PSM_SINGLE_LINE, 'whitelist': DIGITS, 'dpi': None},
+    'pan_number': {'psm': PSM_SINGLE_LINE, 'whitelist': UPPERCASE + DIGITS, 'dpi': None},
+    # The Aadhaar crop also holds the DOB/YoB label the year-only
+    # fallback looks for, so dates are not whitelisted by default.
+    'birth_date': {'psm': PSM_SINGLE_LINE, 'whitelist': None, 'dpi': None},
+    'name': {'psm': PSM_SINGLE_LINE, 'whitelist': None, 'dpi': None},
+}
+
+PAN_PROFILES = {
+    'birth_date': {'psm': PSM_SINGLE_LINE, 'whitelist': DIGITS + '/', 'dpi': None},
+    'name': {'psm': PSM_SINGLE_LINE, 'whitelist': UPPERCASE, 'dpi': None},
+}
+
+# Field regions as (left, top, right, bottom) fractions of a card image
+# cropped to its edges, measured on the sample cards at the top of the
+# repository. Each box holds one printed line: the line above an Aadhaar
+# name is its "Name" label, and the line above a PAN date of birth is the
+# father's name, so a looser box reads the wrong field.
+LAYOUTS = {
+    'aadhaar': {
+        'doc_type': 'aadhaar',
+        'number_field': 'aadhaar_number',
+        'fields': {
+            'aadhaar_number': (0.18, 0.75, 0.86, 0.815),
+            'name': (0.27, 0.41, 0.98, 0.46),
+            'birth_date': (0.27, 0.465, 0.98, 0.535),
+        },
+    },
+    # The 2018 card, as on "aadhar 1 (2).jpeg": the number sits under the
+    # card title between the photo and the QR code, and the name, father's
+    # name and date of birth each sit below their own label.
+    'pan': {
+        'doc_type': 'pan',
+        'number_field': 'pan_number',
+        'fields': {
+            'pan_number': (0.32, 0.395, 0.62, 0.465),
+            'name': (0.04, 0.61, 0.62, 0.645),
+            'birth_date': (0.04, 0.905, 0.28, 0.96),
+        },
+        'profiles': PAN_PROFILES,
+    },
+    # Name, father's name and date of birth first, the number under its
+    # "Permanent Account Number" label, as on pan1.png.
+    'pan_legacy': {
+        'doc_type': 'pan',
+        'number_field': 'pan_number',
+        'fields': {
+            'pan_number': (0.02, 0.685, 0.62, 0.755),
+            'name': (0.02, 0.285, 0.70, 0.35),
+            'birth_date': (0.02, 0.535, 0.45, 0.60),
+        },
+        'profiles': PAN_PROFILES,
+    },
+}
+
+DOC_TYPE_LAYOUTS = {
+    'aadhaar': ('aadhaar',),
+    'pan': ('pan', 'pan_legacy'),
+}
+
+YEAR_RE = re.compile(r'\d{4}')
+# Most cards group the Aadhaar number in fours, but some print it as one
+# run of twelve digits, as on aadhar 1.jpeg. A longer run is the 16-digit
+# virtual ID, not the number.
+AADHAAR_CROP_RE = re.compile(r'(?<!\d)\d{4}\s?\d{4}\s?\d{4}(?!\d)')
+
+# Printed labels and card headings. A crop that slips onto one of these
+# lines would otherwise hand back "Name" or "Date of Birth" as the value.
+LABEL_WORDS = frozenset((
+    'name', 'father', 'fathers', 'date', 'of', 'birth', 'dob', 'yob', 'year',
+    'male', 'female', 'permanent', 'account', 'number', 'card', 'signature',
+    'income', 'tax', 'department', 'government', 'govt', 'india',
+))
+
+
+def parse_number(pattern, text):
+    match = pattern.search(text)
+    return match.group(0).strip() if match else None
+
+
+def parse_aadhaar_number(text):
+    # Returned grouped, the way full-frame OCR reads it.
+    match = AADHAAR_CROP_RE.search(text)
+    if match is None:
+        return None
+    digits = ''.join(match.group(0).split())
+    return ' '.join((digits[:4], digits[4:8], digits[8:]))
+
+
+def parse_birth_date(text):
+    match = DATE_RE.search(text)
+    if match:
+        return match.group(0)
+    label = DOB_LABEL_RE.search(text)
+    if label:
+        year = YEAR_RE.search(text, label.end())
+        if year:
+            return year.group(0)
+    return None
+
+
+def is_label(value):
+    words = re.findall(r'[a-z]+', value.lower())
+    return not words or all(word in LABEL_WORDS for word in words)
+
+
+def parse_name(text):
+    for line in text.splitlines():
+        match = NAME_RE.search(line)
+        if match and len(match.group(0).strip()) > 2 and not is_label(match.group(0)):
+            return match.group(0).strip()
+    return None
+
+
+FIELD_PARSERS = {
+    'aadhaar_number': parse_aadhaar_number,
+    'pan_number': lambda text: parse_number(PAN_NUMBER_RE, text),
+    'birth_date': parse_birth_date,
+    'name': parse_name,
+}
+
+
+def crop_region(image, box, pad=0.01):
+    height, width = image.shape[:2]
+    left, top, right, bottom = box
+    x0 = max(0, int((left - pad) * width))
+    y0 = max(0, int((top - pad) * height))
+    x1 = min(width, int((right + pad) * width))
+    y1 = min(height, int((bottom + pad) * height))
+    return image[y0:y1, x0:x1]
+
+
+def field_profile(layout, field):
+    return layout.get('profiles', {}).get(field) or FIELD_PROFILES[field]
+
+
+def card_dpi(image):
+    return max(70, round(image.shape[1] / CARD_WIDTH_INCHES))
+
+
+def ocr_field(image, layout, field):
+    crop = crop_region(image, layout['fields'][field])
+    if crop.size == 0:
+        return None
+    profile = field_profile(layout, field)
+    text = image_to_string(crop, psm=profile['psm'], whitelist=profile['whitelist'], dpi=profile['dpi'] or card_dpi(image))
+    return FIELD_PARSERS[field](text)
+
+
+def extract_layout_fields(image, layout_name):
+    layout = LAYOUTS[layout_name]
+    number_field = layout['number_field']
+    # The ID number has the strictest format, so it doubles as a check that
+    # the template actually fits this card before the other crops are read.
+    number = ocr_field(image, layout, number_field)
+    if number is None:
+        return None
+    fields = {number_field: number}
+    for field in layout['fields']:
+        if field != number_field:
+            fields[field] = ocr_field(image, layout, field)
+    return fields
+
+
+def candidate_layouts(doc_type=None):
+    if doc_type is None:
+        return [name for names in DOC_TYPE_LAYOUTS.values() for name in names]
+    return DOC_TYPE_LAYOUTS.get(doc_type, ())
+
+
+def read_id_number(image, doc_type=None):
+    # Only the ID-number crop of each candidate layout is read, which is
+    # enough to recognise a visitor who has been registered before.
+    for layout_name in candidate_layouts(doc_type):
+        layout = LAYOUTS[layout_name]
+        number = ocr_field(image, layout, layout['number_field'])
+        if number is not None:
+            return layout['number_field'], number
+    return None, None
+
+
+def extract_by_layout(image, doc_type=None):
+    for layout_name in candidate_layouts(doc_type):
+        fields = extract_layout_fields(image, layout_name)
+        if fields is None:
+            continue
+        if fields.get('name') and fields.get('birth_date'):
+            logging.debug("Fields read from the %s layout", layout_name)
+            return fields
+        logging.debug("The %s layout matched the ID number but missed name or birth date", layout_name)
+    return None
@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+FOCUS_MIN = float(os.environ.get('VISIOCR_LIVE_FOCUS_MIN', 120))
+GLARE_MAX = float(os.environ.get('VISIOCR_LIVE_GLARE_MAX', 0.02))
+WINDOW_FRAMES = int(os.environ.get('VISIOCR_LIVE_WINDOW', 15))
+
+# Frames are scored on a small copy; the focus measure is only compared
+# between frames of the same camera, so the scale does not matter.
+SCORE_WIDTH = 480
+CARD_ASPECT = 85.6 / 54.0
+CARD_MIN_AREA = 0.15
+
+FrameScore = namedtuple('FrameScore', 'focus glare card usable')
+
+
+def score_frame(frame):
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = SCORE_WIDTH / gray.shape[1]
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    focus = cv2.Laplacian(gray, cv2.CV_64F).var()
+    glare = np.count_nonzero(gray >= 250) / gray.size
+    card = card_present(gray)
+    return FrameScore(focus, glare, card, card and focus >= FOCUS_MIN and glare <= GLARE_MAX)
+
+
+def card_present(gray):
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return False
+    contour = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(contour) < CARD_MIN_AREA * gray.size:
+        return False
+    (_, _), (width, height), _ = cv2.minAreaRect(contour)
+    if min(width, height) == 0:
+        return False
+    aspect = max(width, height) / min(width, height)
+    return abs(aspect - CARD_ASPECT) < 0.3
+
+
+def _ocr_worker(process, requests, results):
+    while True:
+        frame = requests.get()
+        if frame is None:
+            break
+        try:
+            results.put(process(frame))
+        except Exception as e:
+            print(f"Error: OCR of live frame failed: {e}")
+            results.put(None)
+
+
+def run_live_capture(process, accept=None, camera=0, window=WINDOW_FRAMES):
+    # Scores every frame and hands only the sharpest usable frame of each
+    # window to `process` on a background thread, one frame at a time.
+    # Returns the first result `accept` approves, or the last result seen
+    # when the operator quits with 'q'.
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        print("Error: Could not open webcam.")
+        return None
+
+    requests = queue.Queue(maxsize=1)
+    results = queue.Queue()
+    worker = threading.Thread(target=_ocr_worker, args=(process, requests, results), daemon=True)
+    worker.start()
+
+    best = None
+    seen = 0
+    busy = False
+    last_result = None
+    print("Hold the card steady in front of the camera. Press 'q' to stop.")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                print("Error: Failed to capture image.")
+                break
+
+            score = score_frame(frame)
+            if score.usable and (best is None or score.focus > best[0].focus):
+                # Copied because the status overlay is drawn onto frame below.
+                best = (score, frame.copy())
+            seen += 1
+            if seen >= window:
+                if best is not None and not busy:
+                    requests.put(best[1])
+                    busy = True
+                best = None
+                seen = 0
+
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                busy = False
+                if result is not None:
+                    last_result = result
+                    if accept is None or accept(result):
+                        break
+
+            status = "focus %.0f  glare %.1f%%  card %s%s" % (score.focus, score.glare * 100, 'yes' if score.card else 'no', '  OCR...' if busy else '')
+            cv2.putText(frame, status, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if score.usable else (0, 0, 255), 2)
+            cv2.imshow('Live Capture', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("Live capture stopped.")
+                break
+    finally:
+        try:
+            requests.put_nowait(None)
+        except queue.Full:
+            pass
+        cap.release()
+        cv2.destroyAllWindows()
+    return last_result
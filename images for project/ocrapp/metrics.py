@@ -0,0 +1,139 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; OCR of a full card sits around 0.5-2s, the other stages well below.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, _escape(value)) for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labels)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    samples.append((self.name + '_bucket', key + (('le', _format_value(float(bound))),), count))
+                samples.append((self.name + '_sum', key, total))
+                samples.append((self.name + '_count', key, counts[-1]))
+        return samples
+
+
+class Gauge:
+    # Read at scrape time from `func`, for values the app already tracks
+    # (queue depths, cache counters) rather than duplicating them here.
+    def __init__(self, name, help_text, func, type='gauge'):
+        self.name = name
+        self.help_text = help_text
+        self.func = func
+        self.type = type
+
+    def samples(self):
+        try:
+            value = self.func()
+        except Exception:
+            return []
+        return [(self.name, (), value)]
+
+
+def render():
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.append('# HELP %s %s' % (metric.name, metric.help_text))
+        lines.append('# TYPE %s %s' % (metric.name, metric.type))
+        for name, labels, value in metric.samples():
+            lines.append('%s%s %s' % (name, _format_labels(labels), _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+# Each process keeps its own registry: with several server workers every
+# worker is scraped on its own, and stages run inside the batch process
+# pool are not counted.
+STAGE_SECONDS = register(Histogram('visiocr_stage_seconds', 'Time spent in each OCR pipeline stage.', labels=('stage',)))
+STAGE_FAILURES = register(Counter('visiocr_stage_failures_total', 'Pipeline stages that raised an exception.', labels=('stage',)))
+UPLOADS = register(Counter('visiocr_uploads_total', 'Processed uploads by outcome.', labels=('outcome',)))
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
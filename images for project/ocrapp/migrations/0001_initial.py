@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedData',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, null=True)),
+                ('birth_date', models.DateField(null=True)),
+                ('pan_number', models.CharField(max_length=10, null=True)),
+                ('aadhaar_number', models.CharField(max_length=12, null=True)),
+                ('age', models.IntegerField(null=True)),
+                ('qr_code_image', models.BinaryField(null=True)),
+            ],
+            options={
+                'db_table': 'extracted_data',
+            },
+        ),
+    ]
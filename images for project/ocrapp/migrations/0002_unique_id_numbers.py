@@ -0,0 +1,71 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+ID_FIELDS = ('pan_number', 'aadhaar_number')
+
+
+def clear_duplicate_numbers(ExtractedData):
+    # Tables adopted with --fake-initial can hold one row per visit. The
+    # newest row, the one lookups already returned, keeps the number; the
+    # older rows stay, with that number cleared.
+    for field in ID_FIELDS:
+        duplicates = ExtractedData.objects.exclude(**{field: None}).values(field).annotate(newest=Max('id'), rows=Count('id')).filter(rows__gt=1)
+        for row in list(duplicates):
+            ExtractedData.objects.filter(**{field: row[field]}).exclude(id=row['newest']).update(**{field: None})
+
+
+def unique_key(field):
+    return models.UniqueConstraint(fields=[field], name=field)
+
+
+# The constraint SQL is run directly: SQLite's add_constraint rebuilds the
+# table from the model as it was before this migration, which would drop
+# the keys again along with any the table already had.
+def add_unique_keys(apps, schema_editor):
+    ExtractedData = apps.get_model('ocrapp', 'ExtractedData')
+    clear_duplicate_numbers(ExtractedData)
+    table = ExtractedData._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        existing = schema_editor.connection.introspection.get_constraints(cursor, table)
+    for field in ID_FIELDS:
+        if any(info['unique'] and info['columns'] == [field] for info in existing.values()):
+            continue
+        # The mysql.connector code fell back to a plain index of the same
+        # name when duplicates blocked its unique key.
+        if field in existing:
+            schema_editor.execute(models.Index(fields=[field], name=field).remove_sql(ExtractedData, schema_editor))
+        schema_editor.execute(unique_key(field).create_sql(ExtractedData, schema_editor))
+
+
+def remove_unique_keys(apps, schema_editor):
+    ExtractedData = apps.get_model('ocrapp', 'ExtractedData')
+    for field in ID_FIELDS:
+        schema_editor.execute(unique_key(field).remove_sql(ExtractedData, schema_editor))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocrapp', '0001_initial'),
+    ]
+
+    operations = [
+        # 0001 only describes the table, so --fake-initial can adopt an
+        # existing one; the unique keys the upserts rely on are added here,
+        # unless the table already has them.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_unique_keys, remove_unique_keys),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='extracteddata',
+                    constraint=models.UniqueConstraint(fields=('pan_number',), name='pan_number'),
+                ),
+                migrations.AddConstraint(
+                    model_name='extracteddata',
+                    constraint=models.UniqueConstraint(fields=('aadhaar_number',), name='aadhaar_number'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class ExtractedData(models.Model):
+    # Maps the table the mysql.connector code used to create, so an
+    # existing database is adopted with `migrate --fake-initial`.
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, null=True)
+    birth_date = models.DateField(null=True)
+    pan_number = models.CharField(max_length=10, null=True)
+    aadhaar_number = models.CharField(max_length=12, null=True)
+    age = models.IntegerField(null=True)
+    qr_code_image = models.BinaryField(null=True)
+
+    class Meta:
+        db_table = 'extracted_data'
+        constraints = [
+            models.UniqueConstraint(fields=['pan_number'], name='pan_number'),
+            models.UniqueConstraint(fields=['aadhaar_number'], name='aadhaar_number'),
+        ]
+
+    def __str__(self):
+        return self.name or ''
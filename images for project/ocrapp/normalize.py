@@ -0,0 +1,124 @@
+import logging
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Long side of an ID-1 card (85.6 mm) at 300 DPI, which keeps printed card
+# text around the 20-30 px height Tesseract reads best.
+OCR_TARGET_SIDE = 1012
+
+# A card photographed on a desk may fill only part of the frame. Frames are
+# decoded with this much headroom over the target, then cropped to the card
+# when its edges are found, so the card itself ends up at the target side.
+# Just under 2, so 12 MP phone photos (4032 and 4000 px) still decode at
+# half size instead of in full.
+FRAME_HEADROOM = 1.9
+CARD_SEARCH_WIDTH = 480
+CARD_MIN_AREA = 0.08
+CARD_ASPECT = 85.6 / 54.0
+
+REDUCED_GRAYSCALE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+
+# Enough of the file for PIL to find the dimensions behind large EXIF blocks.
+HEADER_BYTES = 256 * 1024
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def image_size(data):
+    # PIL only parses the header here; pixels are never decoded. Most
+    # headers sit in the head of the upload, so that is tried first; large
+    # EXIF or ICC segments can push the size past it.
+    for head in (data[:HEADER_BYTES], data):
+        try:
+            with Image.open(BytesIO(head)) as image:
+                return image.size
+        except Exception as e:
+            logging.debug("Could not read image header: %s", e)
+        if len(data) <= HEADER_BYTES:
+            break
+    return None
+
+
+def frame_side(target_side):
+    return int(target_side * FRAME_HEADROOM)
+
+
+def decode_flag(size, target_side=OCR_TARGET_SIDE):
+    if size is None:
+        return cv2.IMREAD_GRAYSCALE
+    long_side = max(size)
+    for factor, flag in REDUCED_GRAYSCALE_FLAGS:
+        if long_side // factor >= target_side:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def card_bounds(gray):
+    # The card's bounding box as (x, y, width, height) in `gray`, or None
+    # when no card-shaped outline covers enough of the frame.
+    scale = min(1.0, CARD_SEARCH_WIDTH / gray.shape[1])
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    edges = cv2.dilate(cv2.Canny(cv2.GaussianBlur(small, (5, 5), 0), 50, 150), None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    contour = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(contour) < CARD_MIN_AREA * small.size:
+        return None
+    (_, _), (width, height), _ = cv2.minAreaRect(contour)
+    if min(width, height) == 0 or abs(max(width, height) / min(width, height) - CARD_ASPECT) >= 0.3:
+        return None
+    x, y, width, height = cv2.boundingRect(contour)
+    return round(x / scale), round(y / scale), round(width / scale), round(height / scale)
+
+
+def normalize_image(image, target_side=OCR_TARGET_SIDE):
+    if image.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        image = cv2.cvtColor(image, code)
+    bounds = card_bounds(image)
+    if bounds is not None:
+        x, y, width, height = bounds
+        image = image[y:y + height, x:x + width]
+    height, width = image.shape[:2]
+    long_side = max(height, width)
+    if bounds is None and long_side > target_side:
+        # Without the card's edges its size in the frame is unknown, so
+        # more of the frame's resolution is kept for the text on it.
+        target_side = min(long_side, frame_side(target_side))
+    if long_side == target_side:
+        return image
+    scale = target_side / long_side
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=interpolation)
+
+
+def preprocess_image(image):
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    processed_image = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    return processed_image
+
+
+def decode_normalized(data, target_side=OCR_TARGET_SIDE, max_pixels=None):
+    size = image_size(data)
+    if max_pixels and size is None:
+        raise ImageTooLarge("Image size could not be read, so the %d pixel limit cannot be checked" % max_pixels)
+    if max_pixels and size[0] * size[1] > max_pixels:
+        raise ImageTooLarge("%dx%d image exceeds the %d pixel limit" % (size[0], size[1], max_pixels))
+    # JPEG decoders scale down in the DCT domain, so the reduced flags cut
+    # both decode time and peak memory for large phone photos.
+    flag = decode_flag(size, frame_side(target_side))
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image is None:
+        return None
+    return normalize_image(image, target_side)
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import atexit
+import logging
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# This module, pdf_ingest and live_capture are also imported as top-level
+# modules by the Tkinter tools, where there are no Django settings, so all
+# three take their options from VISIOCR_* environment variables.
+OCR_POOL_SIZE = int(os.environ.get('VISIOCR_OCR_POOL_SIZE', os.cpu_count() or 1))
+OCR_LANG = os.environ.get('VISIOCR_OCR_LANG', 'eng')
+OCR_TESSDATA = os.environ.get('VISIOCR_TESSDATA')
+
+
+class EnginePool:
+    def __init__(self, size=OCR_POOL_SIZE, lang=OCR_LANG, tessdata=OCR_TESSDATA):
+        self.size = max(1, size)
+        self.lang = lang
+        self.tessdata = tessdata
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _new_engine(self):
+        kwargs = {'lang': self.lang}
+        if self.tessdata:
+            kwargs['path'] = self.tessdata
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if not create:
+            return self._idle.get()
+        try:
+            return self._new_engine()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _release(self, engine):
+        engine.Clear()
+        self._idle.put(engine)
+
+    def warm(self, count=None):
+        engines = []
+        try:
+            for _ in range(min(count or self.size, self.size)):
+                engines.append(self._acquire())
+        finally:
+            for engine in engines:
+                self._idle.put(engine)
+        logging.debug("Warmed %d OCR engine(s) in process %d", len(engines), self._pid)
+
+    def close(self):
+        while True:
+            try:
+                engine = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            engine.End()
+            with self._lock:
+                self._created -= 1
+
+    def image_to_string(self, image, psm=None, whitelist=None, dpi=None):
+        engine = self._acquire()
+        try:
+            if psm is not None:
+                engine.SetPageSegMode(psm)
+            if whitelist:
+                engine.SetVariable('tessedit_char_whitelist', whitelist)
+            engine.SetImage(image)
+            if dpi:
+                engine.SetSourceResolution(dpi)
+            return engine.GetUTF8Text()
+        finally:
+            # Engines go back to the pool, so per-call settings are undone.
+            if psm is not None:
+                engine.SetPageSegMode(tesserocr.PSM.AUTO)
+            if whitelist:
+                engine.SetVariable('tessedit_char_whitelist', '')
+            self._release(engine)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if tesserocr is None:
+        return None
+    # Engines cannot be shared across fork(), so every worker process
+    # builds its own pool the first time it needs one.
+    with _pool_lock:
+        if _pool is None or _pool._pid != os.getpid():
+            _pool = EnginePool()
+        return _pool
+
+
+def warm_up(count=None):
+    pool = get_pool()
+    if pool is None:
+        logging.debug("tesserocr is not installed; OCR falls back to pytesseract")
+        return
+    try:
+        pool.warm(count)
+    except Exception as e:
+        logging.error("Error while warming OCR engines: %s", e)
+
+
+def _to_pil(image):
+    if isinstance(image, Image.Image):
+        return image
+    return Image.fromarray(np.ascontiguousarray(image))
+
+
+def tesseract_config(psm=None, whitelist=None, dpi=None):
+    options = []
+    if psm is not None:
+        options.append('--psm %d' % psm)
+    if dpi:
+        options.append('--dpi %d' % dpi)
+    if whitelist:
+        options.append('-c tessedit_char_whitelist=%s' % whitelist)
+    return ' '.join(options)
+
+
+def image_to_string(image, psm=None, whitelist=None, dpi=None):
+    image = _to_pil(image)
+    pool = get_pool()
+    if pool is not None:
+        try:
+            return pool.image_to_string(image, psm=psm, whitelist=whitelist, dpi=dpi)
+        except Exception as e:
+            logging.error("OCR engine pool failed, falling back to pytesseract: %s", e)
+    return pytesseract.image_to_string(image, lang=OCR_LANG, config=tesseract_config(psm, whitelist, dpi))
+
+
+@atexit.register
+def _shutdown():
+    if _pool is not None and _pool._pid == os.getpid():
+        _pool.close()
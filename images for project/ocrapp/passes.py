@@ -0,0 +1,146 @@
+import os
+import json
+import base64
+import time
+import hashlib
+import logging
+from io import BytesIO
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+import qrcode
+
+PASS_FIELDS = ('name', 'birth_date', 'age', 'pan_number', 'aadhaar_number')
+# The TTL sweep lists the whole cache directory, so it runs at most this
+# often rather than after every pre-rendered pass.
+PRUNE_INTERVAL = 60 * 60
+
+_last_prune = 0.0
+
+
+# Re-issued passes ask for the same payload again, so the PNG is memoized.
+@lru_cache(maxsize=1024)
+def create_qr_code(data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    qr_img_bytes = BytesIO()
+    qr_img.save(qr_img_bytes, format='PNG')
+    return qr_img_bytes.getvalue()
+
+
+def qr_code_base64(qr_code_image_data):
+    return base64.b64encode(qr_code_image_data).decode()
+
+
+# How the download form posts a field the visitor's card does not have.
+EMPTY_VALUES = ('', 'None')
+
+
+def pass_context(data):
+    # Values arrive as strings from the download form and as ints/strings
+    # from the upload path; normalising them keeps one cache key per pass.
+    context = {}
+    for field in PASS_FIELDS:
+        value = data.get(field)
+        value = str(value) if value is not None else None
+        context[field] = None if value in EMPTY_VALUES else value
+    return context
+
+
+def pass_key(context):
+    return hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+
+
+def render_pass_pdf(context):
+    template = get_template('ocr_app/pdf_template.html')
+    html = template.render(context)
+    pdf = BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=pdf)
+    if pisa_status.err:
+        return html, None
+    return html, pdf.getvalue()
+
+
+def pass_cache_dir():
+    return str(getattr(settings, 'VISIOCR_PASS_CACHE_DIR', settings.BASE_DIR / 'cache' / 'passes'))
+
+
+def cached_pass_path(context):
+    path = os.path.join(pass_cache_dir(), pass_key(context) + '.pdf')
+    return path if os.path.exists(path) else None
+
+
+def ensure_pass_pdf(context):
+    path = cached_pass_path(context)
+    if path is not None:
+        return path, None
+    html, pdf = render_pass_pdf(context)
+    if pdf is None:
+        return None, html
+    directory = pass_cache_dir()
+    path = os.path.join(directory, pass_key(context) + '.pdf')
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error("Error while caching visitor pass %s: %s", path, e)
+        return None, html
+    prune_passes(directory)
+    return path, None
+
+
+def open_pass_pdf(context):
+    # Only passes pre-rendered for registered visitors are kept on disk.
+    # Anything else the download form is sent is rendered in memory, so
+    # made-up field values cannot fill the cache directory.
+    path = cached_pass_path(context)
+    if path is not None:
+        try:
+            return open(path, 'rb'), None
+        except OSError:
+            pass
+    html, pdf = render_pass_pdf(context)
+    if pdf is None:
+        return None, html
+    return BytesIO(pdf), None
+
+
+def prune_passes(directory):
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    max_age = getattr(settings, 'VISIOCR_PASS_CACHE_TTL', 7 * 24 * 60 * 60)
+    cutoff = now - max_age
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.endswith('.pdf') and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def prerender_pass(context):
+    try:
+        ensure_pass_pdf(context)
+    except Exception as e:
+        logging.error("Error while pre-rendering visitor pass: %s", e)
@@ -0,0 +1,36 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+PDF_DPI = int(os.environ.get('VISIOCR_PDF_DPI', 300))
+PDF_WORKERS = int(os.environ.get('VISIOCR_PDF_WORKERS', os.cpu_count() or 1))
+
+
+def page_count(pdf_path):
+    return pdfinfo_from_path(pdf_path)['Pages']
+
+
+def rasterize_page(pdf_path, page, dpi=PDF_DPI):
+    return convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page, grayscale=True)[0]
+
+
+def iter_pages(pdf_path, dpi=PDF_DPI, workers=PDF_WORKERS):
+    # Yields (page number, grayscale PIL image) in page order. Each page is a
+    # separate pdftoppm run on a thread, at most `workers` pages ahead of the
+    # caller, so stopping early leaves the remaining pages unrasterized.
+    pages = page_count(pdf_path)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        next_page = 1
+        try:
+            while next_page <= pages or pending:
+                while next_page <= pages and len(pending) < workers:
+                    pending.append((next_page, executor.submit(rasterize_page, pdf_path, next_page, dpi)))
+                    next_page += 1
+                page, future = pending.popleft()
+                yield page, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
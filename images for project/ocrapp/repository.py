@@ -0,0 +1,155 @@
+import base64
+import binascii
+import logging
+import operator
+from datetime import date
+from functools import reduce
+
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+
+from .models import ExtractedData
+
+ID_FIELDS = ('pan_number', 'aadhaar_number')
+# What a returning visitor's row is refreshed with. The ID numbers are
+# left alone so a PAN scan never clears a stored Aadhaar number.
+UPSERT_FIELDS = ('name', 'birth_date', 'qr_code_image', 'age')
+
+
+def stored_aadhaar(aadhaar_number):
+    # Stored as the 12 digits the column holds; OCR reads them grouped.
+    return ''.join(aadhaar_number.split()) if aadhaar_number else None
+
+
+def display_aadhaar(digits):
+    return ' '.join(digits[i:i + 4] for i in range(0, len(digits), 4)) if digits else None
+
+
+PNG_SIGNATURE = b'\x89PNG'
+
+
+def stored_qr_code(qr_code_image):
+    # Rows written before QR codes were stored as PNG bytes hold their
+    # base64 text instead. Anything that is not a PNG either way is
+    # dropped, and the caller generates the QR code again.
+    if qr_code_image is None:
+        return None
+    data = qr_code_image.encode() if isinstance(qr_code_image, str) else bytes(qr_code_image)
+    if data.startswith(PNG_SIGNATURE):
+        return data
+    try:
+        data = base64.b64decode(data.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data if data.startswith(PNG_SIGNATURE) else None
+
+
+def visitor_record(name, birth_date, pan_number, aadhaar_number, qr_code_image):
+    return {
+        'name': name,
+        'birth_date': birth_date.strftime("%d/%m/%Y") if birth_date else None,
+        'age': (date.today() - birth_date).days // 365 if birth_date else None,
+        'pan_number': pan_number,
+        'aadhaar_number': display_aadhaar(aadhaar_number),
+        'qr_code_image': stored_qr_code(qr_code_image),
+    }
+
+
+def lookup_visitor(pan_number=None, aadhaar_number=None):
+    # Also called from executor and job threads, outside the request cycle.
+    close_old_connections()
+    for field, value in (('pan_number', pan_number), ('aadhaar_number', stored_aadhaar(aadhaar_number))):
+        if not value:
+            continue
+        try:
+            row = ExtractedData.objects.filter(**{field: value}).order_by('-id').first()
+        except DatabaseError as e:
+            logging.error("Error while looking up visitor by %s: %s", field, e)
+            return None
+        if row is not None:
+            return visitor_record(row.name, row.birth_date, row.pan_number, row.aadhaar_number, row.qr_code_image)
+    return None
+
+
+def upsert_key(row):
+    for field in ID_FIELDS:
+        if getattr(row, field):
+            return field
+    return None
+
+
+def merge_target(pan_number, aadhaar_number, matches):
+    # `matches` are the stored rows holding either number, as dicts of id,
+    # pan_number and aadhaar_number. Returns the id of the row to update,
+    # or None for a new row, and the ID numbers to write. The PAN row wins,
+    # as in upsert_key. A number another row already holds, or that would
+    # replace a different stored one, is left out so no unique key breaks.
+    numbers = {'pan_number': pan_number, 'aadhaar_number': aadhaar_number}
+    for field in ID_FIELDS:
+        target = next((row for row in matches if numbers[field] and row[field] == numbers[field]), None)
+        if target is not None:
+            break
+    else:
+        return None, numbers
+    return target['id'], {field: value for field, value in numbers.items() if value and target[field] is None and all(row[field] != value for row in matches)}
+
+
+def new_record(row):
+    name, birth_date, pan_number, aadhaar_number, qr_code_image, age = row
+    return ExtractedData(name=name, birth_date=birth_date, pan_number=pan_number, aadhaar_number=stored_aadhaar(aadhaar_number), qr_code_image=qr_code_image, age=age)
+
+
+def bulk_upsert(rows, key):
+    if key is None:
+        ExtractedData.objects.bulk_create(rows)
+        return
+    options = {'update_conflicts': True, 'update_fields': UPSERT_FIELDS}
+    # SQLite needs the conflict target spelled out; MySQL rejects it and
+    # upserts on whichever unique key collides.
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = [key]
+    ExtractedData.objects.bulk_create(rows, **options)
+
+
+def upsert_row(record):
+    numbers = [Q(**{field: getattr(record, field)}) for field in ID_FIELDS if getattr(record, field)]
+    with transaction.atomic():
+        matches = list(ExtractedData.objects.filter(reduce(operator.or_, numbers)).values('id', *ID_FIELDS)) if numbers else []
+        target_id, fill = merge_target(record.pan_number, record.aadhaar_number, matches)
+        if target_id is None:
+            record.save()
+            return
+        values = {field: getattr(record, field) for field in UPSERT_FIELDS}
+        values.update(fill)
+        ExtractedData.objects.filter(id=target_id).update(**values)
+
+
+def insert_row(row):
+    try:
+        upsert_row(new_record(row))
+    except DatabaseError as e:
+        logging.error("Error while inserting data into table: %s", e)
+        logging.error("Failed to insert data: Name: %s, Birth Date: %s, PAN Number: %s, Aadhaar Number: %s", row[0], row[1], row[2], row[3])
+        return False
+    return True
+
+
+def insert_many(rows):
+    # Runs on the batch writer thread, which the request cycle never
+    # visits, so stale persistent connections are dropped here.
+    close_old_connections()
+    groups = {}
+    for row in rows:
+        record = new_record(row)
+        groups.setdefault(upsert_key(record), []).append(record)
+    try:
+        with transaction.atomic():
+            for key, group in groups.items():
+                bulk_upsert(group, key)
+    except DatabaseError as e:
+        # One bad row fails the whole batch; written one at a time, only
+        # that row is lost.
+        logging.error("Error while inserting a batch of %d record(s), retrying one at a time: %s", len(rows), e)
+        return [insert_row(row) for row in rows]
+    logging.debug("Inserted %d record(s)", len(rows))
+    return True
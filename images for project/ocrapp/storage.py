@@ -0,0 +1,135 @@
+import sqlite3
+import threading
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import repository
+from .repository import stored_aadhaar, visitor_record, merge_target, ID_FIELDS, UPSERT_FIELDS
+
+# Backends implement insert_many(rows), taking the batch writer's
+# (name, birth_date, pan_number, aadhaar_number, qr_code_image, age)
+# tuples and returning whether they were written, either one bool for the
+# batch or a list with one per row, and
+# lookup_visitor(pan_number, aadhaar_number), returning the stored
+# visitor record or None.
+
+
+class DjangoStore:
+    # The ExtractedData model on the project's default database.
+    def insert_many(self, rows):
+        return repository.insert_many(rows)
+
+    def lookup_visitor(self, pan_number=None, aadhaar_number=None):
+        return repository.lookup_visitor(pan_number, aadhaar_number)
+
+
+SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS extracted_data (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(255), birth_date DATE, pan_number VARCHAR(10), aadhaar_number VARCHAR(12), age INTEGER, qr_code_image BLOB)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS pan_number ON extracted_data (pan_number)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS aadhaar_number ON extracted_data (aadhaar_number)",
+)
+SQLITE_INSERT = "INSERT INTO extracted_data (name, birth_date, pan_number, aadhaar_number, qr_code_image, age) VALUES (?, ?, ?, ?, ?, ?)"
+SQLITE_UPSERT = SQLITE_INSERT + " ON CONFLICT ({key}) DO UPDATE SET " + ', '.join('%s = excluded.%s' % (field, field) for field in UPSERT_FIELDS)
+SQLITE_MATCH = "SELECT id, pan_number, aadhaar_number FROM extracted_data WHERE pan_number = ? OR aadhaar_number = ?"
+SQLITE_LOOKUP = "SELECT name, birth_date, pan_number, aadhaar_number, qr_code_image FROM extracted_data WHERE {column} = ? ORDER BY id DESC LIMIT 1"
+
+
+class SQLiteStore:
+    # A single-file stand-in for MySQL, for running and load testing the
+    # service on one machine. WAL lets lookups read while the writer
+    # commits, and each writer batch is one transaction.
+    def __init__(self, path=None, timeout=30, synchronous='NORMAL'):
+        self.path = str(path or settings.BASE_DIR / 'visitors.sqlite3')
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+        connection = self._connection()
+        for statement in SQLITE_SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self):
+        # sqlite3 connections are tied to the thread that opened them.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=%s" % self.synchronous)
+            self._local.connection = connection
+        return connection
+
+    def insert_many(self, rows):
+        prepared = []
+        groups = {}
+        for name, birth_date, pan_number, aadhaar_number, qr_code_image, age in rows:
+            aadhaar_number = stored_aadhaar(aadhaar_number)
+            key = 'pan_number' if pan_number else 'aadhaar_number' if aadhaar_number else None
+            birth_date = birth_date.isoformat() if birth_date else None
+            prepared.append((name, birth_date, pan_number, aadhaar_number, qr_code_image, age))
+            groups.setdefault(key, []).append(prepared[-1])
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for key, group in groups.items():
+                connection.executemany(SQLITE_UPSERT.format(key=key) if key else SQLITE_INSERT, group)
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            # One bad row fails the whole batch; written one at a time, only
+            # that row is lost.
+            logging.error("Error while inserting a batch of %d record(s), retrying one at a time: %s", len(rows), e)
+            return [self._insert_row(connection, row, original) for row, original in zip(prepared, rows)]
+        logging.debug("Inserted %d record(s)", len(rows))
+        return True
+
+    def _insert_row(self, connection, row, original):
+        name, birth_date, pan_number, aadhaar_number, qr_code_image, age = row
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            matches = [dict(zip(('id',) + ID_FIELDS, match)) for match in connection.execute(SQLITE_MATCH, (pan_number, aadhaar_number))]
+            target_id, fill = merge_target(pan_number, aadhaar_number, matches)
+            if target_id is None:
+                connection.execute(SQLITE_INSERT, row)
+            else:
+                values = {'name': name, 'birth_date': birth_date, 'qr_code_image': qr_code_image, 'age': age}
+                values.update(fill)
+                assignments = ', '.join('%s = ?' % field for field in values)
+                connection.execute("UPDATE extracted_data SET %s WHERE id = ?" % assignments, (*values.values(), target_id))
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logging.error("Error while inserting data into table: %s", e)
+            logging.error("Failed to insert data: Name: %s, Birth Date: %s, PAN Number: %s, Aadhaar Number: %s", original[0], original[1], original[2], original[3])
+            return False
+        return True
+
+    def lookup_visitor(self, pan_number=None, aadhaar_number=None):
+        for column, value in (('pan_number', pan_number), ('aadhaar_number', stored_aadhaar(aadhaar_number))):
+            if not value:
+                continue
+            try:
+                row = self._connection().execute(SQLITE_LOOKUP.format(column=column), (value,)).fetchone()
+            except sqlite3.Error as e:
+                logging.error("Error while looking up visitor by %s: %s", column, e)
+                return None
+            if row is not None:
+                name, birth_date, pan, aadhaar, qr_code_image = row
+                return visitor_record(name, date.fromisoformat(birth_date) if birth_date else None, pan, aadhaar, qr_code_image)
+        return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = import_string(getattr(settings, 'VISIOCR_STORAGE_BACKEND', 'ocrapp.storage.DjangoStore'))
+            _store = backend(**getattr(settings, 'VISIOCR_STORAGE_OPTIONS', {}))
+        return _store
@@ -1,3 +1,480 @@
-from django.test import TestCase
+import os
+import json
+import time
+import shutil
+import tempfile
+import base64
+import zipfile
+from io import BytesIO
+import importlib.util
+from datetime import date
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils.datastructures import MultiValueDict
+
+from .fields import parse_text, birth_date_value, valid_aadhaar
+from .ladder import valid_fields
+from . import views
+from .cache import ResultCache, content_key
+from .layouts import FIELD_PARSERS
+from .writer import BatchWriter
+from .jobs import JobQueue, QUEUED, RUNNING, FAILED
+from .models import ExtractedData
+from . import repository
+from .storage import SQLiteStore
+from .passes import pass_context, pass_key
+from .normalize import OCR_TARGET_SIDE, HEADER_BYTES, ImageTooLarge, card_bounds, decode_flag, decode_normalized, frame_side, image_size
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent.parent.parent / 'benchmarks'
+SAMPLES_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_legacy_parse_text():
+    # The per-field regex version parse_text replaced lives on in the
+    # benchmark, which compares the two for speed.
+    spec = importlib.util.spec_from_file_location('parse_text_bench', BENCHMARKS_DIR / 'parse_text_bench.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.legacy_parse_text
+
+
+class ParseTextTests(SimpleTestCase):
+    def test_matches_legacy_parser_on_corpus(self):
+        legacy_parse_text = load_legacy_parse_text()
+        with open(BENCHMARKS_DIR / 'ocr_outputs.json') as f:
+            corpus = json.load(f)
+        for text in corpus:
+            with self.subTest(text=text):
+                expected = legacy_parse_text(text)
+                result = parse_text(text)
+                if expected[3] and '\n' in expected[3]:
+                    # The legacy Aadhaar pattern matched across line breaks;
+                    # the scanner keeps to one line.
+                    self.assertEqual(result[:3], expected[:3])
+                    self.assertNotIn('\n', result[3] or '')
+                else:
+                    self.assertEqual(result, expected)
+
+
+class LayoutParserTests(SimpleTestCase):
+    def test_aadhaar_number_printed_without_spaces(self):
+        # The number crop of aadhar 1.jpeg reads as one run of digits.
+        self.assertEqual(FIELD_PARSERS['aadhaar_number']('095237614258\n'), '0952 3761 4258')
+
+    def test_aadhaar_number_printed_grouped(self):
+        self.assertEqual(FIELD_PARSERS['aadhaar_number']('4521 8873 1290\n'), '4521 8873 1290')
+
+    def test_virtual_id_is_not_an_aadhaar_number(self):
+        self.assertIsNone(FIELD_PARSERS['aadhaar_number']('9152376142581234\n'))
+
+    def test_label_is_not_a_name(self):
+        self.assertEqual(FIELD_PARSERS['name']('नाम / Name:\nSUNDAR VAIJINATH SHINGARE\n'), 'SUNDAR VAIJINATH SHINGARE')
+        self.assertIsNone(FIELD_PARSERS['name']('Date of Birth\n'))
+
+
+@override_settings(VISIOCR_BATCH_MAX_FILES=3, VISIOCR_MAX_UPLOAD_BYTES=1000, VISIOCR_BATCH_MAX_BYTES=2500)
+class BatchUploadLimitTests(SimpleTestCase):
+    def collect(self, entries):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for name, data in entries:
+                zip_file.writestr(name, data)
+        upload = SimpleUploadedFile('cards.zip', archive.getvalue(), content_type='application/zip')
+        return views.collect_batch_uploads(MultiValueDict({'images': [upload]}))
+
+    def test_images_read_from_archive(self):
+        uploads = self.collect([('a.jpg', b'a' * 800), ('notes.txt', b'x'), ('b.png', b'b' * 800)])
+        self.assertEqual(uploads, [('a.jpg', 800, b'a' * 800), ('b.png', 800, b'b' * 800)])
+
+    def test_oversized_entry_reported_without_reading(self):
+        uploads = self.collect([('a.jpg', b'a' * 800), ('big.jpg', b'b' * 5000)])
+        self.assertEqual(uploads[1], ('big.jpg', 5000, None))
+
+    def test_too_many_entries(self):
+        with self.assertRaises(views.BatchTooLarge):
+            self.collect([('%d.jpg' % i, b'x') for i in range(4)])
+
+    def test_uncompressed_total_over_limit(self):
+        # Compresses to a few hundred bytes, but the limit is on what it
+        # would take to hold the images.
+        with self.assertRaises(views.BatchTooLarge):
+            self.collect([('%d.jpg' % i, b'x' * 900) for i in range(3)])
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='visiocr-cache-test-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        cache = ResultCache(memory_items=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_disk_tier_evicts_oldest_over_budget(self):
+        value = {'text': 'x' * 100}
+        entry_bytes = len(json.dumps(value))
+        cache = ResultCache(self.directory, memory_items=1, disk_bytes=entry_bytes * 2 + entry_bytes // 4)
+        keys = [content_key(str(i).encode()) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, value)
+            # Spaced out so the eviction order does not depend on the
+            # filesystem's timestamp resolution.
+            os.utime(cache._path(key), (1000 * (i + 1), 1000 * (i + 1)))
+        self.assertFalse(os.path.exists(cache._path(keys[0])))
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[1]), value)
+        self.assertEqual(cache.get(keys[2]), value)
+
+    def extract(self, read_fields):
+        cache = ResultCache(self.directory)
+        with mock.patch.object(views, 'get_cache', return_value=cache), \
+                mock.patch.object(views, 'decode_image', return_value=np.zeros((10, 10), np.uint8)), \
+                mock.patch.object(views, 'classify_upload', return_value=None), \
+                mock.patch.object(views, 'number_first_visitor', return_value=None), \
+                mock.patch.object(views, 'read_fields', side_effect=read_fields):
+            result, _ = views.extract_upload(b'upload')
+        return result, cache.get(content_key(b'upload'))
+
+    def test_ocr_outage_is_not_cached(self):
+        def fail(image, doc_type):
+            raise RuntimeError('tesseract is not installed')
+        with self.assertLogs(level='ERROR'):
+            result, cached = self.extract(fail)
+        self.assertEqual(result, (None, None, None, None))
+        self.assertIsNone(cached)
+
+    def test_empty_result_is_not_cached(self):
+        result, cached = self.extract(lambda image, doc_type: (None, None, None, None))
+        self.assertIsNone(cached)
+
+    def test_readable_result_is_cached(self):
+        fields = ('Sunil Verma', '1979', None, '4521 8873 1290')
+        result, cached = self.extract(lambda image, doc_type: fields)
+        self.assertEqual(cached, list(fields))
+
+
+class JobQueueTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='visiocr-jobs-test-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # Workers are never started; the tests claim jobs themselves.
+        self.queue = JobQueue(os.path.join(directory, 'jobs.sqlite3'), os.path.join(directory, 'spool'), handler=None)
+
+    def test_resubmitting_same_upload_returns_existing_job(self):
+        job = self.queue.submit('card.jpg', b'image')
+        self.assertEqual(job['status'], QUEUED)
+        self.assertEqual(self.queue.submit('copy.jpg', b'image')['id'], job['id'])
+        self.assertNotEqual(self.queue.submit('other.jpg', b'other image')['id'], job['id'])
+
+    def test_failed_job_is_not_reused(self):
+        job = self.queue.submit('card.jpg', b'image')
+        self.queue._finish(job['id'], FAILED, error='unreadable')
+        self.assertNotEqual(self.queue.submit('card.jpg', b'image')['id'], job['id'])
+
+    def test_claim_takes_each_job_once_in_order(self):
+        first = self.queue.submit('first.jpg', b'first')
+        second = self.queue.submit('second.jpg', b'second')
+        self.assertEqual(self.queue._claim(), first['id'])
+        self.assertEqual(self.queue.get(first['id'])['status'], RUNNING)
+        self.assertEqual(self.queue._claim(), second['id'])
+        self.assertIsNone(self.queue._claim())
+        self.assertEqual(self.queue.depth(), 2)
+
+
+class BatchWriterTests(SimpleTestCase):
+    def make_writer(self, **options):
+        batches = []
+        writer = BatchWriter(lambda rows: batches.append(rows) or True, name='test-writer', **options)
+        self.addCleanup(writer.close, timeout=5)
+        return writer, batches
+
+    def test_flushes_full_batch_without_waiting(self):
+        writer, batches = self.make_writer(batch_size=3, flush_interval=30)
+        futures = [writer.submit(i) for i in range(3)]
+        self.assertTrue(all(future.result(timeout=5) for future in futures))
+        self.assertEqual(batches, [[0, 1, 2]])
+
+    def test_flushes_partial_batch_after_interval(self):
+        writer, batches = self.make_writer(batch_size=50, flush_interval=0.1)
+        start = time.monotonic()
+        self.assertTrue(writer.submit('row', durable=True, timeout=5))
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(batches, [['row']])
+
+    def test_write_failure_resolves_futures_false(self):
+        def fail(rows):
+            raise RuntimeError('database down')
+        writer = BatchWriter(fail, batch_size=1, flush_interval=0.1, name='test-writer')
+        self.addCleanup(writer.close, timeout=5)
+        with self.assertLogs(level='ERROR'):
+            self.assertFalse(writer.submit('row', durable=True, timeout=5))
+
+    def test_per_row_results_resolve_their_own_futures(self):
+        writer = BatchWriter(lambda rows: [row != 'bad' for row in rows], batch_size=2, flush_interval=30, name='test-writer')
+        self.addCleanup(writer.close, timeout=5)
+        good, bad = writer.submit('good'), writer.submit('bad')
+        self.assertTrue(good.result(timeout=5))
+        self.assertFalse(bad.result(timeout=5))
+
+
+def visitor_row(name, pan_number=None, aadhaar_number=None):
+    return (name, date(1990, 1, 1), pan_number, aadhaar_number, b'\x89PNG', 30)
+
+
+class InsertManyTests(TestCase):
+    def stored(self):
+        return sorted(ExtractedData.objects.values_list('name', 'pan_number', 'aadhaar_number'))
+
+    def test_conflict_on_second_key_only_affects_that_row(self):
+        repository.insert_many([visitor_row('A', aadhaar_number='2345 6789 0124')])
+        with self.assertLogs(level='ERROR'):
+            result = repository.insert_many([visitor_row('B', 'PPPPP1111P', '2345 6789 0124'), visitor_row('C', 'QQQQQ2222Q')])
+        self.assertEqual(result, [True, True])
+        # B carries the Aadhaar number already stored, so it refreshes that
+        # row and fills in its PAN.
+        self.assertEqual(self.stored(), [('B', 'PPPPP1111P', '234567890124'), ('C', 'QQQQQ2222Q', None)])
+
+    def test_numbers_held_by_two_rows_update_the_pan_row(self):
+        repository.insert_many([visitor_row('A', 'PPPPP1111P'), visitor_row('D', aadhaar_number='2345 6789 0124')])
+        self.assertTrue(repository.insert_many([visitor_row('B', 'PPPPP1111P', '2345 6789 0124'), visitor_row('C', 'QQQQQ2222Q')]))
+        self.assertEqual(self.stored(), [('B', 'PPPPP1111P', None), ('C', 'QQQQQ2222Q', None), ('D', None, '234567890124')])
+
+    def test_merge_target_keeps_unique_keys(self):
+        pan_row = {'id': 1, 'pan_number': 'PPPPP1111P', 'aadhaar_number': None}
+        aadhaar_row = {'id': 2, 'pan_number': None, 'aadhaar_number': '234567890124'}
+        self.assertEqual(repository.merge_target('PPPPP1111P', '234567890124', [pan_row, aadhaar_row]), (1, {}))
+        self.assertEqual(repository.merge_target('PPPPP1111P', '234567890124', [aadhaar_row]), (2, {'pan_number': 'PPPPP1111P'}))
+        self.assertEqual(repository.merge_target('PPPPP1111P', None, []), (None, {'pan_number': 'PPPPP1111P', 'aadhaar_number': None}))
+
+    def test_returning_visitor_updates_their_row(self):
+        repository.insert_many([visitor_row('A', 'PPPPP1111P')])
+        self.assertTrue(repository.insert_many([visitor_row('A Kumar', 'PPPPP1111P', '2345 6789 0124')]))
+        self.assertEqual(self.stored(), [('A Kumar', 'PPPPP1111P', None)])
+        self.assertEqual(repository.lookup_visitor(aadhaar_number=None, pan_number='PPPPP1111P')['name'], 'A Kumar')
+
+
+class NumberFirstTests(SimpleTestCase):
+    def test_aadhaar_checksum(self):
+        self.assertTrue(valid_aadhaar('2345 6789 0124'))
+        self.assertTrue(valid_aadhaar('234567890124'))
+        self.assertFalse(valid_aadhaar('2345 6789 0125'))
+        # Two neighbouring digits swapped.
+        self.assertFalse(valid_aadhaar('2345 6789 0142'))
+        self.assertFalse(valid_aadhaar('0952 3761 4258'))
+        self.assertFalse(valid_aadhaar('2345 6789 012'))
+
+    def number_first(self, field, number):
+        store = mock.Mock(**{'lookup_visitor.return_value': {'name': 'A', 'birth_date': '01/01/1990', 'age': 36, 'pan_number': None, 'aadhaar_number': number, 'qr_code_image': 'qr'}})
+        with mock.patch.object(views, 'get_store', return_value=store), \
+                mock.patch.object(views, 'preprocess_image'), \
+                mock.patch.object(views, 'read_id_number', return_value=(field, number)):
+            return views.number_first_visitor(np.zeros((10, 10), np.uint8), 'aadhaar'), store.lookup_visitor
+
+    def test_known_number_skips_full_ocr(self):
+        visitor, lookup = self.number_first('aadhaar_number', '2345 6789 0124')
+        lookup.assert_called_once_with(None, '2345 6789 0124')
+        self.assertEqual(visitor[5], 'qr')
+
+    def test_misread_number_is_not_looked_up(self):
+        visitor, lookup = self.number_first('aadhaar_number', '2345 6789 0125')
+        self.assertIsNone(visitor)
+        lookup.assert_not_called()
+
+
+class ReturningVisitorTests(SimpleTestCase):
+    stored = {'name': 'RAHUL KUMAR SHARMA', 'birth_date': '14/08/1992', 'age': 32, 'pan_number': 'ABCDE1234F', 'aadhaar_number': None, 'qr_code_image': 'qr'}
+
+    def register(self, name, birth_date):
+        store = mock.Mock(**{'lookup_visitor.return_value': self.stored})
+        with mock.patch.object(views, 'get_store', return_value=store), \
+                mock.patch.object(views, 'insert_data') as insert_data, \
+                mock.patch.object(views, 'get_thread_pool'), \
+                mock.patch.object(views, 'create_qr_code', return_value='new qr'):
+            visitor = views.register_visitor(name, birth_date, 'ABCDE1234F', None)
+        return visitor, insert_data.called
+
+    def test_matching_visitor_gets_stored_pass(self):
+        visitor, inserted = self.register('Rahul Kumar Sharrna', '14/08/1992')
+        self.assertEqual(visitor[5], 'qr')
+        self.assertFalse(inserted)
+
+    def test_misread_pan_of_another_visitor_registers(self):
+        for name, birth_date in (('Priya Ramesh Iyer', '14/08/1992'), ('Rahul Kumar Sharma', '02/03/1985')):
+            with self.subTest(name=name, birth_date=birth_date):
+                with self.assertLogs(level='WARNING'):
+                    visitor, inserted = self.register(name, birth_date)
+                self.assertEqual(visitor[:2], (name, birth_date))
+                self.assertEqual(visitor[5], 'new qr')
+                self.assertTrue(inserted)
+
+
+class LookupVisitorTests(TestCase):
+    def test_lookup_by_grouped_aadhaar_number(self):
+        repository.insert_many([visitor_row('A', aadhaar_number='2345 6789 0124')])
+        visitor = repository.lookup_visitor(aadhaar_number='2345 6789 0124')
+        self.assertEqual((visitor['name'], visitor['birth_date'], visitor['aadhaar_number']), ('A', '01/01/1990', '2345 6789 0124'))
+        self.assertIsNone(repository.lookup_visitor(pan_number='PPPPP1111P'))
+
+    def test_legacy_base64_qr_code_is_decoded(self):
+        ExtractedData.objects.create(name='A', birth_date=date(1990, 1, 1), pan_number='PPPPP1111P', qr_code_image=base64.b64encode(b'\x89PNG data'), age=30)
+        self.assertEqual(repository.lookup_visitor(pan_number='PPPPP1111P')['qr_code_image'], b'\x89PNG data')
+
+    def test_unique_keys(self):
+        ExtractedData.objects.create(name='A', pan_number='PPPPP1111P')
+        with self.assertRaises(IntegrityError):
+            ExtractedData.objects.create(name='B', pan_number='PPPPP1111P')
+
+
+class UniqueKeysMigrationTests(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(('ocrapp', '0002_unique_id_numbers'))
+
+    def test_adopted_table_keeps_newest_row_per_number(self):
+        apps = self.migrate(('ocrapp', '0001_initial'))
+        OldExtractedData = apps.get_model('ocrapp', 'ExtractedData')
+        old = OldExtractedData.objects.create(name='First visit', pan_number='PPPPP1111P', aadhaar_number='234567890124')
+        new = OldExtractedData.objects.create(name='Second visit', pan_number='PPPPP1111P')
+        self.migrate(('ocrapp', '0002_unique_id_numbers'))
+        stored = dict(ExtractedData.objects.values_list('id', 'pan_number'))
+        self.assertEqual(stored, {old.id: None, new.id: 'PPPPP1111P'})
+        self.assertEqual(ExtractedData.objects.get(id=old.id).aadhaar_number, '234567890124')
+        with self.assertRaises(IntegrityError):
+            ExtractedData.objects.create(name='Third visit', pan_number='PPPPP1111P')
+
+
+class SQLiteStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='visiocr-store-test-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.store = SQLiteStore(os.path.join(directory, 'visitors.sqlite3'))
+
+    def stored(self):
+        return sorted(self.store._connection().execute("SELECT name, pan_number, aadhaar_number FROM extracted_data").fetchall())
+
+    def test_returning_visitor_updates_their_row(self):
+        self.store.insert_many([visitor_row('A', 'PPPPP1111P')])
+        self.assertTrue(self.store.insert_many([visitor_row('A Kumar', 'PPPPP1111P', '2345 6789 0124')]))
+        self.assertEqual(self.stored(), [('A Kumar', 'PPPPP1111P', None)])
+        visitor = self.store.lookup_visitor(pan_number='PPPPP1111P')
+        self.assertEqual((visitor['name'], visitor['birth_date']), ('A Kumar', '01/01/1990'))
+
+    def test_lookup_by_grouped_aadhaar_number(self):
+        self.store.insert_many([visitor_row('A', aadhaar_number='2345 6789 0124')])
+        self.assertEqual(self.store.lookup_visitor(aadhaar_number='2345 6789 0124')['aadhaar_number'], '2345 6789 0124')
+
+    def test_conflict_on_second_key_only_affects_that_row(self):
+        self.store.insert_many([visitor_row('A', aadhaar_number='2345 6789 0124')])
+        with self.assertLogs(level='ERROR'):
+            result = self.store.insert_many([visitor_row('B', 'PPPPP1111P', '2345 6789 0124'), visitor_row('C', 'QQQQQ2222Q')])
+        self.assertEqual(result, [True, True])
+        self.assertEqual(self.stored(), [('B', 'PPPPP1111P', '234567890124'), ('C', 'QQQQQ2222Q', None)])
+
+    def test_legacy_base64_qr_code_is_decoded(self):
+        self.store._connection().execute("INSERT INTO extracted_data (name, pan_number, qr_code_image) VALUES (?, ?, ?)", ('A', 'PPPPP1111P', base64.b64encode(b'\x89PNG data').decode()))
+        self.assertEqual(self.store.lookup_visitor(pan_number='PPPPP1111P')['qr_code_image'], b'\x89PNG data')
+        self.assertIsNone(self.store.lookup_visitor(pan_number='QQQQQ2222Q'))
+
+
+class PassKeyTests(SimpleTestCase):
+    registered = {'name': 'Rahul Kumar Sharma', 'birth_date': '14/08/1992', 'age': 32, 'pan_number': None, 'aadhaar_number': '4521 8873 1290'}
+
+    def test_download_form_matches_pre_rendered_pass(self):
+        expected = pass_key(pass_context(self.registered))
+        for empty in ('', 'None'):
+            with self.subTest(empty=empty):
+                posted = dict(self.registered, age='32', pan_number=empty)
+                self.assertEqual(pass_key(pass_context(posted)), expected)
+
+    def test_different_visitors_get_different_keys(self):
+        other = dict(self.registered, name='Priya Ramesh Iyer')
+        self.assertNotEqual(pass_key(pass_context(other)), pass_key(pass_context(self.registered)))
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_phone_photos_decode_at_half_size(self):
+        for size in ((4032, 3024), (4000, 3000), (3024, 4032)):
+            with self.subTest(size=size):
+                self.assertEqual(decode_flag(size, frame_side(OCR_TARGET_SIDE)), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+
+    def test_small_and_unknown_sizes_decode_in_full(self):
+        self.assertEqual(decode_flag((1600, 1200), frame_side(OCR_TARGET_SIDE)), cv2.IMREAD_GRAYSCALE)
+        self.assertEqual(decode_flag(None, frame_side(OCR_TARGET_SIDE)), cv2.IMREAD_GRAYSCALE)
+
+    def jpeg_with_large_header(self):
+        # A big ICC profile pushes the frame header past the first probe.
+        output = BytesIO()
+        Image.new('RGB', (640, 480), 'white').save(output, 'JPEG', icc_profile=b'\0' * (HEADER_BYTES + 1024))
+        return output.getvalue()
+
+    def test_size_read_past_a_large_header(self):
+        self.assertEqual(image_size(self.jpeg_with_large_header()), (640, 480))
+
+    def test_pixel_limit_checked_past_a_large_header(self):
+        with self.assertRaises(ImageTooLarge):
+            decode_normalized(self.jpeg_with_large_header(), max_pixels=640 * 480 - 1)
+        self.assertIsNotNone(decode_normalized(self.jpeg_with_large_header(), max_pixels=640 * 480))
+
+    def test_unknown_size_rejected_under_pixel_limit(self):
+        with self.assertRaises(ImageTooLarge):
+            decode_normalized(b'not an image', max_pixels=640 * 480)
+
+    def card_in_frame(self):
+        card = cv2.imread(str(SAMPLES_DIR / 'aadhar 1.jpeg'), cv2.IMREAD_GRAYSCALE)
+        height, width = card.shape
+        frame = np.full((height * 3, width * 3), 60, np.uint8)
+        frame[height:height * 2, width:width * 2] = card
+        return frame, (width, height, width, height)
+
+    def test_card_bounds_finds_card_on_a_desk(self):
+        frame, expected = self.card_in_frame()
+        bounds = card_bounds(frame)
+        self.assertIsNotNone(bounds)
+        for found, value in zip(bounds, expected):
+            self.assertAlmostEqual(found, value, delta=expected[2] * 0.05)
+
+    def test_card_bounds_none_without_a_card(self):
+        self.assertIsNone(card_bounds(np.full((600, 800), 200, np.uint8)))
+
+    def test_card_is_cropped_before_scaling(self):
+        frame, (_, _, width, height) = self.card_in_frame()
+        image = decode_normalized(cv2.imencode('.png', frame)[1].tobytes())
+        self.assertEqual(max(image.shape), OCR_TARGET_SIDE)
+        self.assertAlmostEqual(image.shape[1] / image.shape[0], width / height, delta=0.05)
+
+
+class YearOfBirthTests(SimpleTestCase):
+    def test_year_of_birth_is_a_valid_birth_date(self):
+        self.assertEqual(birth_date_value('1979'), date(1979, 1, 1))
+        self.assertEqual(birth_date_value('14/08/1992'), date(1992, 8, 14))
+        self.assertTrue(valid_fields(('Sunil Verma', '1979', None, None)))
+        self.assertFalse(valid_fields(('Sunil Verma', '19/79', None, None)))
+
+    @override_settings(VISIOCR_RETURNING_LOOKUP=False)
+    def test_year_of_birth_visitor_is_registered(self):
+        with mock.patch.object(views, 'insert_data') as insert_data, mock.patch.object(views, 'get_thread_pool'):
+            name, birth_date, age, _, _, _ = views.register_visitor('Sunil Verma', '1979', None, '4521 8873 1290')
+        self.assertEqual((name, birth_date), ('Sunil Verma', '1979'))
+        self.assertEqual(age, (date.today() - date(1979, 1, 1)).days // 365)
+        insert_data.assert_called_once()
@@ -0,0 +1,22 @@
+import mmap
+from contextlib import contextmanager
+
+
+@contextmanager
+def upload_buffer(uploaded_file):
+    # Hand the upload to hashing and cv2.imdecode without read(): uploads
+    # Django spooled to disk are mapped, in-memory ones are viewed in place.
+    temporary_file_path = getattr(uploaded_file, 'temporary_file_path', None)
+    if temporary_file_path is not None and uploaded_file.size:
+        with open(temporary_file_path(), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    yield view
+        return
+    getbuffer = getattr(uploaded_file.file, 'getbuffer', None)
+    if getbuffer is not None:
+        with getbuffer() as view:
+            yield view
+        return
+    uploaded_file.seek(0)
+    yield memoryview(uploaded_file.read())
@@ -4,5 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('upload/', views.upload_image, name='upload_image'),
+    path('upload/batch/', views.upload_batch, name='upload_batch'),
     path('download/', views.download_pdf, name='download_pdf'),
+    path('jobs/', views.submit_job, name='submit_job'),
+    path('jobs/<str:job_id>/', views.job_status, name='job_status'),
+    path('async/upload/', views.upload_image_async, name='upload_image_async'),
+    path('async/download/', views.download_pdf_async, name='download_pdf_async'),
+    path('metrics', views.export_metrics, name='metrics'),
 ]
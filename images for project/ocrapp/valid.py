@@ -1,20 +1,26 @@
 import pytesseract as tess
-from PIL import Image
+import numpy as np
 import cv2
 from tkinter import Tk, Label, Button, filedialog, Text
-from pdf2image import convert_from_path
 import os
 import re
 
+from ocr_engine import image_to_string
+from pdf_ingest import iter_pages
+from live_capture import run_live_capture
+
 # Set the path to the Tesseract executable
 tess.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+DEBUG_DUMP = bool(os.environ.get('VISIOCR_DEBUG_DUMP'))
+
 def capture_image():
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("Error: Could not open webcam.")
         return None
 
+    captured = None
     print("Press 's' to capture image and 'q' to quit.")
     while True:
         ret, frame = cap.read()
@@ -26,9 +32,9 @@ def capture_image():
         
         key = cv2.waitKey(1) & 0xFF
         if key == ord('s'):
-            image_path = 'captured_image.jpg'
-            cv2.imwrite(image_path, frame)
-            print(f"Image captured and saved as {image_path}")
+            captured = frame
+            debug_dump('captured_image.jpg', frame)
+            print("Image captured.")
             break
         elif key == ord('q'):
             print("Image capture cancelled.")
@@ -36,7 +42,7 @@ def capture_image():
 
     cap.release()
     cv2.destroyAllWindows()
-    return image_path
+    return captured
 
 def select_file():
     file_path = filedialog.askopenfilename(
@@ -45,28 +51,41 @@ def select_file():
     if file_path:
         ext = os.path.splitext(file_path)[1].lower()
         if ext == '.pdf':
-            images = convert_from_path(file_path)
-            image_path = 'temp_image.jpg'
-            images[0].save(image_path, 'JPEG')
+            validated_info = process_pdf(file_path)
         else:
-            image_path = file_path
-        processed_image_path = preprocess_image(image_path)
-        extracted_text = extract_text_from_image(processed_image_path)
-        visitor_info = extract_visitor_information(extracted_text)
-        validated_info = validate_visitor_information(visitor_info)
+            processed_image = preprocess_image(cv2.imread(file_path, cv2.IMREAD_GRAYSCALE))
+            extracted_text = extract_text_from_image(processed_image)
+            visitor_info = extract_visitor_information(extracted_text)
+            validated_info = validate_visitor_information(visitor_info)
         display_extracted_info(validated_info)
 
-def preprocess_image(image_path):
-    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def process_pdf(pdf_path):
+    # Pages are rasterized a few at a time while earlier ones are OCRed, and
+    # we stop at the first page that completes the visitor's details.
+    extracted_text = ''
+    validated_info = validate_visitor_information(extract_visitor_information(extracted_text))
+    for page, image in iter_pages(pdf_path):
+        processed_image = preprocess_image(np.asarray(image))
+        extracted_text += extract_text_from_image(processed_image) + '\n'
+        validated_info = validate_visitor_information(extract_visitor_information(extracted_text))
+        if not validated_info["errors"]:
+            print(f"Visitor details complete after page {page}")
+            break
+    return validated_info
+
+def debug_dump(filename, image):
+    # Intermediate images only touch the disk when VISIOCR_DEBUG_DUMP is set.
+    if DEBUG_DUMP:
+        cv2.imwrite(filename, image)
+
+def preprocess_image(img):
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    processed_image_path = 'processed_image.jpg'
-    cv2.imwrite(processed_image_path, binary)
-    return processed_image_path
+    debug_dump('processed_image.png', binary)
+    return binary
 
-def extract_text_from_image(image_path):
-    i = Image.open(image_path)
-    txt = tess.image_to_string(i)
+def extract_text_from_image(image):
+    txt = image_to_string(image)
     print("OCR Output:\n", txt)  # Debugging statement
     return txt
 
@@ -124,6 +143,9 @@ def create_gui():
     capture_button = Button(root, text="Capture Image from Webcam", command=capture_and_process)
     capture_button.pack(pady=5)
 
+    live_button = Button(root, text="Live Capture (auto)", command=live_capture_and_process)
+    live_button.pack(pady=5)
+
     upload_button = Button(root, text="Upload File", command=select_file)
     upload_button.pack(pady=5)
 
@@ -133,13 +155,22 @@ def create_gui():
     root.mainloop()
 
 def capture_and_process():
-    image_path = capture_image()
-    if image_path:
-        processed_image_path = preprocess_image(image_path)
-        extracted_text = extract_text_from_image(processed_image_path)
+    image = capture_image()
+    if image is not None:
+        processed_image = preprocess_image(image)
+        extracted_text = extract_text_from_image(processed_image)
         visitor_info = extract_visitor_information(extracted_text)
         validated_info = validate_visitor_information(visitor_info)
         display_extracted_info(validated_info)
 
+def live_capture_and_process():
+    def process(frame):
+        extracted_text = extract_text_from_image(preprocess_image(frame))
+        return validate_visitor_information(extract_visitor_information(extracted_text))
+
+    validated_info = run_live_capture(process, accept=lambda info: not info["errors"])
+    if validated_info is not None:
+        display_extracted_info(validated_info)
+
 if __name__ == "__main__":
     create_gui()
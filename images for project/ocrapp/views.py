@@ -1,245 +1,403 @@
-import cv2
-import numpy as np
-import pytesseract
-from datetime import datetime
+import asyncio
+import difflib
+from datetime import date
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, FileResponse
+from django.views.decorators.http import condition
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-import re
-from django.template.loader import get_template
-from xhtml2pdf import pisa 
-import qrcode
-import base64
-from io import BytesIO
-import mysql.connector
-from mysql.connector import Error
+import zipfile
+
+from .ocr_engine import image_to_string
+from .executors import get_process_pool, get_thread_pool
+from .db import insert_data, writer_depth
+from .storage import get_store
+from .cache import get_cache, content_key
+from .jobs import get_job_queue, queue_depth
+from .layouts import extract_by_layout, read_id_number
+from .classifier import classify_document
+from .fields import parse_text, valid_aadhaar, birth_date_value
+from .normalize import decode_normalized, preprocess_image, ImageTooLarge, OCR_TARGET_SIDE
+from .ladder import run_ladder, DEFAULT_LADDER
+from .uploads import upload_buffer
+from .passes import create_qr_code, qr_code_base64, pass_context, pass_key, open_pass_pdf, prerender_pass
+from . import metrics
+from .metrics import stage_timer, UPLOADS
 
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
 
-def home(request):
-    return render(request, 'ocr_app/home.html')
+FIELD_NAMES = ('name', 'birth_date', 'pan_number', 'aadhaar_number')
 
-def preprocess_image(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    processed_image = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-    return processed_image
-
-def extract_info(image):
-    processed_image = preprocess_image(image)
-    text = pytesseract.image_to_string(processed_image)
-    name, birth_date, pan_number, aadhaar_number = parse_text(text) 
-    return name, birth_date, pan_number, aadhaar_number
+# OCR drops and swaps the odd letter, so a name this close to the stored
+# one is taken to be the same visitor.
+NAME_MATCH_RATIO = 0.8
 
-def parse_text(text):
-    name = None
-    birth_date = None
-    pan_number = None
-    aadhaar_number = None
+BATCH_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
 
-    all_text_list = re.split(r'[\n]', text)
-    text_list = list()
-    
-    pan_pattern = r'[A-Z]{5}[0-9]{4}[A-Z]{1}'
-    pan_match = re.search(pan_pattern, text)
-    if pan_match:
-        pan_number = pan_match.group(0).strip()
-
-    aadhar_pattern = r'\d{4}\s\d{4}\s\d{4}'
-    aadhar_match = re.search(aadhar_pattern, text)
-    if aadhar_match:
-        aadhaar_number = aadhar_match.group(0).strip()
-
-    for i in all_text_list:
-        if re.match(r'^(\s)+$', i) or i=='':
-            continue
-        else:
-            text_list.append(i)
+metrics.register(metrics.Gauge('visiocr_cache_hits_total', 'OCR result cache hits.', lambda: get_cache().hits, type='counter'))
+metrics.register(metrics.Gauge('visiocr_cache_misses_total', 'OCR result cache misses.', lambda: get_cache().misses, type='counter'))
+metrics.register(metrics.Gauge('visiocr_db_queue_depth', 'Rows waiting for the database writer.', writer_depth))
+metrics.register(metrics.Gauge('visiocr_job_queue_depth', 'Queued and running OCR jobs.', queue_depth))
 
-    if "MALE" in text or "male" in text or "FEMALE" in text or "female" in text :
-        name, birth_date = extract_aadhar_info(text_list)
-    else:
-        name, birth_date = extract_pan_info(text)
+def home(request):
+    return render(request, 'ocr_app/home.html')
 
+def extract_info(image, doc_type=None):
+    # Poor photos are retried with costlier preprocessing before the user
+    # is asked to upload again. Returns the fields and whether they are
+    # worth caching: OCR ran and read at least one of them.
+    ladder = getattr(settings, 'VISIOCR_PREPROCESS_LADDER', DEFAULT_LADDER)
+    fields, completed = run_ladder(image, lambda processed_image: read_fields(processed_image, doc_type), ladder)
+    return fields, completed and any(fields)
+
+def read_fields(processed_image, doc_type=None):
+    if getattr(settings, 'VISIOCR_LAYOUT_OCR', True):
+        # Layout OCR parses each field as it reads it, so it is all 'ocr'.
+        with stage_timer('ocr'):
+            fields = extract_by_layout(processed_image, doc_type)
+        if fields is not None:
+            return fields['name'], fields['birth_date'], fields.get('pan_number'), fields.get('aadhaar_number')
+    with stage_timer('ocr'):
+        text = image_to_string(processed_image)
+    with stage_timer('parse'):
+        name, birth_date, pan_number, aadhaar_number = parse_text(text) 
     return name, birth_date, pan_number, aadhaar_number
-    
-
-def extract_aadhar_info(text_list):
-    user_dob = str()
-    user_name = str()
-    aadhar_dob_pat = r'(YoB|YOB:|DOB:|DOB|AOB)'
-    date_ele = str()
-    index = None
-    for idx, i in enumerate(text_list):
-        if re.search(aadhar_dob_pat, i):
-            index = re.search(aadhar_dob_pat, i).span()[1]
-            date_ele = i
-            dob_idx = idx
-        else:
-            continue
-
-    if index is not None:
-        date_str = ''
-        for i in date_ele[index:]:
-            if re.match(r'\d', i):
-                date_str = date_str + i
-            elif re.match(r'/', i):
-                date_str = date_str + i
-            else:
-                continue
-
-        user_dob = date_str
-
-        user_name = text_list[dob_idx - 1]
-        pattern = re.search(r'([A-Z][a-zA-Z\s]+)', user_name)
-
-        if pattern:
-            name = pattern.group(0).strip()
-        else:
-            name = None
-
-        return name, user_dob
-    else:
-        return None, None
-
-def extract_pan_info(text):
-    pancard_name=None
-    name_patterns = [
-        r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s]+[A-Z]+[\s])',  
-        r'(Name\s*\n[A-Z]+[\s]+[A-Z]+[\s])', 
-        r'(Name\s*\n[A-Z\s]+)'  
-    ]
-    for pattern in name_patterns:
-            name_match_pan = re.search(pattern,text)
-            if name_match_pan:
-                matched_name = name_match_pan.group(1).strip().replace('\n', ' ') 
-                pancard_name = re.sub(r'^Name\s+', '', matched_name)
-                break
-    dob_match_pan = re.search(r'(\d{2}/\d{2}/\d{4})', text, re.IGNORECASE)
-    if dob_match_pan:
-        birth_date = dob_match_pan.group(0).strip() 
-    else:
-        birth_date = None
-
-    return pancard_name, birth_date
-
-def create_connection():
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='visiocr',
-            user='root',
-            password='root'
-        )
-        return connection
-    except Error as e:
-        logging.error("Error while connecting to MySQL: %s", e)
-        return None
-
-def create_table(connection):
-    try:
-        if connection.is_connected():
-            cursor = connection.cursor()
-            cursor.execute("CREATE TABLE IF NOT EXISTS extracted_data (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255), birth_date DATE, pan_number VARCHAR(10), aadhaar_number VARCHAR(12), age INT, qr_code_image BLOB)")
-            connection.commit()
-            logging.debug("Table 'extracted_data' created successfully")
-            cursor.close()
-    except Error as e:
-        logging.error("Error while creating table: %s", e)
-
-def insert_data(connection, name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age):
-    try:
-        if connection.is_connected():
-            cursor = connection.cursor()
-            sanitized_name = name.replace("'", "''")
-            birth_date = datetime.strptime(birth_date, "%d/%m/%Y").strftime("%Y-%m-%d")
-            cursor.execute("INSERT INTO extracted_data (name, birth_date, pan_number, aadhaar_number, qr_code_image, age) VALUES (%s, %s, %s, %s, %s, %s)", (sanitized_name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age))
-            connection.commit()
-            logging.debug("Record inserted successfully")
-            logging.debug("Name: %s, Birth Date: %s, PAN Number: %s, Aadhaar Number: %s", sanitized_name, birth_date, pan_number, aadhaar_number)
-            cursor.close()
-    except Error as e:
-        logging.error("Error while inserting data into table: %s", e)
-        logging.error("Failed to insert data: Name: %s, Birth Date: %s, PAN Number: %s, Aadhaar Number: %s", sanitized_name, birth_date, pan_number, aadhaar_number)
 
 def process_image(image):
-    name, birth_date, pan_number, aadhaar_number = extract_info(image)
+    (name, birth_date, pan_number, aadhaar_number), _ = extract_info(image)
     logging.debug("Extracted Info: Name=%s, Birth Date=%s, PAN Number=%s, Aadhaar Number=%s", name, birth_date, pan_number, aadhaar_number)
+    return register_visitor(name, birth_date, pan_number, aadhaar_number)
+
+def same_visitor(visitor, name, birth_date):
+    # Only the fields OCR read are compared; a missing one says nothing.
+    if birth_date and visitor['birth_date']:
+        try:
+            if birth_date_value(birth_date) != birth_date_value(visitor['birth_date']):
+                return False
+        except ValueError:
+            pass
+    if name and visitor['name']:
+        read, stored = (' '.join(value.upper().split()) for value in (name, visitor['name']))
+        if difflib.SequenceMatcher(None, read, stored).ratio() < NAME_MATCH_RATIO:
+            return False
+    return True
+
+def returning_visitor(pan_number, aadhaar_number, name=None, birth_date=None):
+    # A misread Aadhaar digit could match another visitor's row, so only
+    # numbers that pass the checksum are looked up. A PAN has no checksum,
+    # so when the name and birth date were read as well they have to agree
+    # with the stored visitor.
+    if aadhaar_number and not valid_aadhaar(aadhaar_number):
+        logging.debug("Aadhaar number %s fails its checksum, not looked up", aadhaar_number)
+        aadhaar_number = None
+    if not (pan_number or aadhaar_number) or not getattr(settings, 'VISIOCR_RETURNING_LOOKUP', True):
+        return None
+    with stage_timer('lookup'):
+        visitor = get_store().lookup_visitor(pan_number, aadhaar_number)
+    if visitor is None:
+        return None
+    if not same_visitor(visitor, name, birth_date):
+        logging.warning("ID number of %s matches stored visitor %s, registering as a new visit", name, visitor['name'])
+        return None
+    logging.debug("Returning visitor %s found by ID number", visitor['name'])
+    return visitor['name'], visitor['birth_date'], visitor['age'], visitor['pan_number'], visitor['aadhaar_number'], visitor['qr_code_image']
+
+def register_visitor(name, birth_date, pan_number, aadhaar_number):
+    # A known ID number gets the pass issued on the earlier visit, so
+    # nothing is written and the QR code and PDF are not made again.
+    visitor = returning_visitor(pan_number, aadhaar_number, name, birth_date)
+    if visitor is not None:
+        return visitor
     if birth_date is None or name is None:
         logging.error("Failed to extract valid name or birth date from the image.")
-        return name, None, None, None 
-
-    connection = create_connection()
-    if not connection:
-        logging.error("Failed to establish a database connection.")
-        return name, None, None, None
+        return name, None, None, None, None, None
 
+    age = None
+    qr_code_image_data = None
     try:
-        create_table(connection)
-        qr_code_image_data = create_qr_code(name)
-        birth_date_obj = datetime.strptime(birth_date, "%d/%m/%Y")
-        age = (datetime.now() - birth_date_obj).days // 365
-        insert_data(connection, name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age)
+        with stage_timer('qr'):
+            qr_code_image_data = create_qr_code(name)
+        age = (date.today() - birth_date_value(birth_date)).days // 365
+        insert_data(name, birth_date, pan_number, aadhaar_number, qr_code_image_data, age)
+        # Render the pass now so the download is served from the cache.
+        get_thread_pool().submit(prerender_pass, pass_context({'name': name, 'birth_date': birth_date, 'age': age, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number}))
     except Exception as e:
         logging.error("Error processing image: %s", e)
-    finally:
-        if connection and connection.is_connected():
-            connection.close()
-            logging.debug("MySQL connection is closed")
 
-    return name, birth_date, age, pan_number, aadhaar_number
+    return name, birth_date, age, pan_number, aadhaar_number, qr_code_image_data
+
+def classify_upload(data):
+    if not getattr(settings, 'VISIOCR_CLASSIFY', True):
+        return None
+    with stage_timer('classify'):
+        return classify_document(data)
+
+def decode_image(data):
+    with stage_timer('decode'):
+        return decode_normalized(data, getattr(settings, 'VISIOCR_OCR_TARGET_SIDE', OCR_TARGET_SIDE), getattr(settings, 'VISIOCR_MAX_IMAGE_PIXELS', None))
+
+def upload_size_error(size):
+    max_bytes = getattr(settings, 'VISIOCR_MAX_UPLOAD_BYTES', None)
+    if max_bytes and size > max_bytes:
+        return "Image is too large. The limit is %d MB." % (max_bytes // (1024 * 1024))
+    return None
+
+def number_first_visitor(image, doc_type):
+    # Most visitors have been here before: reading just the ID number and
+    # looking it up skips the name and birth date OCR for all of them.
+    if not getattr(settings, 'VISIOCR_NUMBER_FIRST', True) or not getattr(settings, 'VISIOCR_RETURNING_LOOKUP', True):
+        return None
+    try:
+        with stage_timer('preprocess'):
+            processed_image = preprocess_image(image)
+        with stage_timer('number_ocr'):
+            field, number = read_id_number(processed_image, doc_type)
+    except Exception as e:
+        logging.error("Number-first OCR failed, running full extraction: %s", e)
+        return None
+    if number is None:
+        return None
+    return returning_visitor(number if field == 'pan_number' else None, number if field == 'aadhaar_number' else None)
+
+def extract_upload(data):
+    # Returns the extracted fields, plus the stored visitor when the
+    # number-first lookup already recognised them.
+    cache = get_cache()
+    key = content_key(data)
+    cached = cache.get(key)
+    if cached is not None:
+        logging.debug("OCR result cache hit for %s", key)
+        return tuple(cached), None
+    image = decode_image(data)
+    if image is None:
+        logging.error("Could not decode the uploaded image.")
+        return (None, None, None, None), None
+    doc_type = classify_upload(data)
+    visitor = number_first_visitor(image, doc_type)
+    if visitor is not None:
+        name, birth_date, age, pan_number, aadhaar_number, _ = visitor
+        result, cacheable = (name, birth_date, pan_number, aadhaar_number), True
+    else:
+        result, cacheable = extract_info(image, doc_type)
+    if cacheable:
+        cache.put(key, list(result))
+    return result, visitor
+
+def ocr_upload(filename, data):
+    # Runs inside the OCR process pool, so it must stay picklable and
+    # must not touch the database.
+    try:
+        image = decode_image(data)
+    except ImageTooLarge as e:
+        return {'filename': filename, 'error': str(e)}
+    if image is None:
+        return {'filename': filename, 'error': "Could not decode image"}
+    (name, birth_date, pan_number, aadhaar_number), cacheable = extract_info(image, classify_upload(data))
+    return {'filename': filename, 'name': name, 'birth_date': birth_date, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number, 'cacheable': cacheable}
 
 
-def create_qr_code(data):
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
+def process_upload(data):
+    (name, birth_date, pan_number, aadhaar_number), visitor = extract_upload(data)
+    logging.debug("Extracted Info: Name=%s, Birth Date=%s, PAN Number=%s, Aadhaar Number=%s", name, birth_date, pan_number, aadhaar_number)
+    if visitor is not None:
+        UPLOADS.inc(outcome='returning')
+    else:
+        visitor = register_visitor(name, birth_date, pan_number, aadhaar_number)
+        UPLOADS.inc(outcome='unreadable' if visitor[1] is None else 'registered' if visitor[2] is not None else 'failed')
+    name, birth_date, age, pan_number, aadhaar_number, qr_code_image_data = visitor
+    if qr_code_image_data is None:
+        with stage_timer('qr'):
+            qr_code_image_data = create_qr_code(name)
+    return name, birth_date, age, pan_number, aadhaar_number, qr_code_image_data
 
-    qr_img = qr.make_image(fill_color="black", back_color="white")
+def process_uploaded_file(uploaded_file):
+    with upload_buffer(uploaded_file) as data:
+        return process_upload(data)
 
-    qr_img_bytes = BytesIO()
-    qr_img.save(qr_img_bytes, format='PNG')
-    qr_img_bytes.seek(0)
+def upload_result(request, name, birth_date, age, pan_number, aadhaar_number, qr_code_image_data):
+    if birth_date is None and name is None:
+        return render(request, 'ocr_app/home.html', {'error_message': "Image quality is too poor. Please try again."})
 
-    qr_code_image_data = base64.b64encode(qr_img_bytes.getvalue()).decode()
-    
-    return qr_code_image_data
+    return render(request, 'ocr_app/home.html', {'name': name, 'birth_date': birth_date, 'age': age, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number, 'qr_code_image_data': qr_code_base64(qr_code_image_data)})
 
 @csrf_exempt  
 def upload_image(request):
     if request.method == 'POST' and 'image' in request.FILES:
         uploaded_file = request.FILES['image']
-        image = cv2.imdecode(np.frombuffer(uploaded_file.read(), np.uint8), -1)
-        name, birth_date, age, pan_number, aadhaar_number = process_image(image)
-        qr_code_image_data = create_qr_code(name)
-        if birth_date is None and name is None:
-            return render(request, 'ocr_app/home.html', {'error_message': "Image quality is too poor. Please try again."})
-        
-        return render(request, 'ocr_app/home.html', {'name': name, 'birth_date': birth_date, 'age': age, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number, 'qr_code_image_data': qr_code_image_data})
+        error_message = upload_size_error(uploaded_file.size)
+        if error_message:
+            UPLOADS.inc(outcome='rejected')
+            return render(request, 'ocr_app/home.html', {'error_message': error_message})
+        try:
+            result = process_uploaded_file(uploaded_file)
+        except ImageTooLarge as e:
+            UPLOADS.inc(outcome='rejected')
+            logging.error("Rejected upload: %s", e)
+            return render(request, 'ocr_app/home.html', {'error_message': "Image is too large. Please upload a smaller photo."})
+        return upload_result(request, *result)
     
     return render(request, 'ocr_app/home.html')
 
-def download_pdf(request):
-    template_path = 'ocr_app/pdf_template.html'
-    context = {
-        'name': request.POST.get('name'),
-        'birth_date': request.POST.get('birth_date'),
-        'age': request.POST.get('age'),
-        'pan_number': request.POST.get('pan_number'),
-        'aadhaar_number': request.POST.get('aadhaar_number'),
-    }
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="visiting_pass.pdf"'
-
-    template = get_template(template_path)
-    html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
+# The async variants are meant for the ASGI entry point (VisiOCR/asgi.py).
+# OCR and PDF rendering run on a bounded thread pool, so the event loop keeps
+# accepting uploads while earlier ones are still being read.
+@csrf_exempt
+async def upload_image_async(request):
+    if request.method == 'POST' and 'image' in request.FILES:
+        uploaded_file = request.FILES['image']
+        error_message = upload_size_error(uploaded_file.size)
+        if error_message:
+            UPLOADS.inc(outcome='rejected')
+            return render(request, 'ocr_app/home.html', {'error_message': error_message})
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(get_thread_pool(), process_uploaded_file, uploaded_file)
+        except ImageTooLarge as e:
+            UPLOADS.inc(outcome='rejected')
+            logging.error("Rejected upload: %s", e)
+            return render(request, 'ocr_app/home.html', {'error_message': "Image is too large. Please upload a smaller photo."})
+        return upload_result(request, *result)
+
+    return render(request, 'ocr_app/home.html')
+
+def download_data(request):
+    return request.POST if request.method == 'POST' else request.GET
+
+def pass_etag(request):
+    return pass_key(pass_context(download_data(request)))
+
+def pass_response(pdf, html):
+    if pdf is None:
         return HttpResponse('We had some errors <pre>' + html + '</pre>')
-    return response
+    return FileResponse(pdf, as_attachment=True, filename='visiting_pass.pdf', content_type='application/pdf')
+
+@condition(etag_func=pass_etag)
+def download_pdf(request):
+    return pass_response(*open_pass_pdf(pass_context(download_data(request))))
+
+@condition(etag_func=pass_etag)
+async def download_pdf_async(request):
+    loop = asyncio.get_running_loop()
+    pdf, html = await loop.run_in_executor(get_thread_pool(), open_pass_pdf, pass_context(download_data(request)))
+    return pass_response(pdf, html)
+
+class BatchTooLarge(Exception):
+    pass
+
+def collect_batch_uploads(files):
+    # Returns (filename, size, data) for every image; data is None when
+    # the image is over the per-upload limit, so it is reported without
+    # being read. ZIP entries are checked against the sizes in the
+    # archive directory before anything is decompressed.
+    max_files = getattr(settings, 'VISIOCR_BATCH_MAX_FILES', 200)
+    max_bytes = getattr(settings, 'VISIOCR_MAX_UPLOAD_BYTES', None)
+    max_total = getattr(settings, 'VISIOCR_BATCH_MAX_BYTES', None)
+    uploads = []
+    total = 0
+    for uploaded_file in files.getlist('images') + files.getlist('image'):
+        if uploaded_file.name.lower().endswith('.zip') or zipfile.is_zipfile(uploaded_file):
+            uploaded_file.seek(0)
+            with zipfile.ZipFile(uploaded_file) as archive:
+                entries = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(BATCH_IMAGE_EXTENSIONS)]
+                if len(uploads) + len(entries) > max_files:
+                    raise BatchTooLarge("Too many images, the limit is %d." % max_files)
+                for info in entries:
+                    if max_bytes and info.file_size > max_bytes:
+                        uploads.append((info.filename, info.file_size, None))
+                        continue
+                    total += info.file_size
+                    if max_total and total > max_total:
+                        raise BatchTooLarge("The batch is too large, the limit is %d MB uncompressed." % (max_total // (1024 * 1024)))
+                    # zipfile never returns more than the declared file_size,
+                    # so a forged directory entry cannot inflate past it.
+                    uploads.append((info.filename, info.file_size, archive.read(info)))
+        else:
+            if len(uploads) + 1 > max_files:
+                raise BatchTooLarge("Too many images, the limit is %d." % max_files)
+            if max_bytes and uploaded_file.size > max_bytes:
+                uploads.append((uploaded_file.name, uploaded_file.size, None))
+                continue
+            total += uploaded_file.size
+            if max_total and total > max_total:
+                raise BatchTooLarge("The batch is too large, the limit is %d MB uncompressed." % (max_total // (1024 * 1024)))
+            uploaded_file.seek(0)
+            uploads.append((uploaded_file.name, uploaded_file.size, uploaded_file.read()))
+    return uploads
+
+@csrf_exempt
+def upload_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST one or more images or a ZIP archive."}, status=405)
+    try:
+        uploads = collect_batch_uploads(request.FILES)
+    except zipfile.BadZipFile:
+        return JsonResponse({'error': "Invalid ZIP archive."}, status=400)
+    except BatchTooLarge as e:
+        return JsonResponse({'error': str(e)}, status=413)
+    if not uploads:
+        return JsonResponse({'error': "No images found in the upload."}, status=400)
+
+    cache = get_cache()
+    pool = get_process_pool()
+    pending = []
+    for filename, size, data in uploads:
+        error_message = upload_size_error(size)
+        if error_message:
+            pending.append((filename, None, {'filename': filename, 'error': error_message}))
+            continue
+        key = content_key(data)
+        cached = cache.get(key)
+        if cached is not None:
+            pending.append((filename, key, dict(zip(FIELD_NAMES, cached), filename=filename)))
+        else:
+            pending.append((filename, key, pool.submit(ocr_upload, filename, data)))
+    results = []
+    for filename, key, job in pending:
+        if isinstance(job, dict):
+            result = job
+        else:
+            try:
+                result = job.result()
+            except Exception as e:
+                logging.error("Error processing %s in batch: %s", filename, e)
+                result = {'filename': filename, 'error': "OCR failed"}
+            if result.pop('cacheable', False):
+                cache.put(key, [result[field] for field in FIELD_NAMES])
+        if 'error' not in result:
+            name, birth_date, age, pan_number, aadhaar_number, _ = register_visitor(result['name'], result['birth_date'], result['pan_number'], result['aadhaar_number'])
+            result['age'] = age
+            result['registered'] = age is not None
+        results.append(result)
+    logging.debug("Processed batch of %d image(s)", len(results))
+    return JsonResponse({'results': results})
+
+def run_job(data):
+    name, birth_date, age, pan_number, aadhaar_number, qr_code_image_data = process_upload(data)
+    if birth_date is None and name is None:
+        return {'error_message': "Image quality is too poor. Please try again."}
+    return {'name': name, 'birth_date': birth_date, 'age': age, 'pan_number': pan_number, 'aadhaar_number': aadhaar_number, 'qr_code_image_data': qr_code_base64(qr_code_image_data)}
+
+@csrf_exempt
+def submit_job(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST an image to queue it for OCR."}, status=405)
+    if 'image' not in request.FILES:
+        return JsonResponse({'error': "No image in the upload."}, status=400)
+    uploaded_file = request.FILES['image']
+    error_message = upload_size_error(uploaded_file.size)
+    if error_message:
+        return JsonResponse({'error': error_message}, status=413)
+    with upload_buffer(uploaded_file) as data:
+        job = get_job_queue(run_job).submit(uploaded_file.name, data)
+    return JsonResponse(job, status=202)
+
+def job_status(request, job_id):
+    job = get_job_queue(run_job).get(job_id)
+    if job is None:
+        return JsonResponse({'error': "Unknown job."}, status=404)
+    return JsonResponse(job)
+
+def export_metrics(request):
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
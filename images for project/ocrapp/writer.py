@@ -0,0 +1,103 @@
+import time
+import queue
+import atexit
+import threading
+import logging
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatchWriter:
+    def __init__(self, write_rows, batch_size=50, flush_interval=0.5, name='batch-writer'):
+        self.write_rows = write_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, row, durable=False, timeout=None):
+        self.start()
+        future = Future()
+        self._queue.put((row, future))
+        if durable:
+            return future.result(timeout)
+        return future
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            self._write(batch)
+        # Drain whatever was queued behind the stop marker.
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._write(leftover)
+
+    def _write(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            ok = self.write_rows(rows)
+        except Exception as e:
+            logging.error("%s failed to write %d row(s): %s", self.name, len(rows), e)
+            ok = False
+        # write_rows reports either the whole batch or each row.
+        results = ok if isinstance(ok, list) else [ok] * len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_writers = []
+
+
+def register(writer):
+    _writers.append(writer)
+    return writer
+
+
+@atexit.register
+def _close_all():
+    for writer in _writers:
+        writer.close(timeout=10)
@@ -1,13 +1,20 @@
 import cv2
-from PIL import Image
+import numpy as np
 import pytesseract as tess
 from tkinter import Tk, Label, Button, filedialog, Text
-from pdf2image import convert_from_path
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'images for project', 'ocrapp'))
+from ocr_engine import image_to_string
+from pdf_ingest import iter_pages
+from live_capture import run_live_capture
 
 # Set the path to the Tesseract executable
 tess.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+DEBUG_DUMP = bool(os.environ.get('VISIOCR_DEBUG_DUMP'))
+
 def capture_image():
     cap = cv2.VideoCapture(0)
 
@@ -15,6 +22,7 @@ def capture_image():
         print("Error: Could not open webcam.")
         return None
 
+    captured = None
     print("Press 's' to capture image and 'q' to quit.")
     while True:
         ret, frame = cap.read()
@@ -26,9 +34,9 @@ def capture_image():
         
         key = cv2.waitKey(1) & 0xFF
         if key == ord('s'):
-            image_path = 'captured_image.jpg'
-            cv2.imwrite(image_path, frame)
-            print(f"Image captured and saved as {image_path}")
+            captured = frame
+            debug_dump('captured_image.jpg', frame)
+            print("Image captured.")
             break
         elif key == ord('q'):
             print("Image capture cancelled.")
@@ -36,7 +44,7 @@ def capture_image():
 
     cap.release()
     cv2.destroyAllWindows()
-    return image_path
+    return captured
 
 def select_file():
     file_path = filedialog.askopenfilename(
@@ -45,27 +53,36 @@ def select_file():
     if file_path:
         ext = os.path.splitext(file_path)[1].lower()
         if ext == '.pdf':
-            images = convert_from_path(file_path)
-            image_path = 'temp_image.jpg'
-            images[0].save(image_path, 'JPEG')
-        else:
-            image_path = file_path
-        processed_image_path = preprocess_image(image_path)
-        extracted_text = extract_text_from_image(processed_image_path)
+            process_pdf(file_path)
+            return
+        processed_image = preprocess_image(cv2.imread(file_path, cv2.IMREAD_GRAYSCALE))
+        extracted_text = extract_text_from_image(processed_image)
         text_display.delete('1.0', 'end')
         text_display.insert('1.0', extracted_text)
 
-def preprocess_image(image_path):
-    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def process_pdf(pdf_path):
+    # Show each page's text as soon as it is OCRed while later pages are
+    # still being rasterized.
+    text_display.delete('1.0', 'end')
+    for page, image in iter_pages(pdf_path):
+        processed_image = preprocess_image(np.asarray(image))
+        extracted_text = extract_text_from_image(processed_image)
+        text_display.insert('end', f"--- Page {page} ---\n{extracted_text}\n")
+        text_display.update_idletasks()
+
+def debug_dump(filename, image):
+    # Intermediate images only touch the disk when VISIOCR_DEBUG_DUMP is set.
+    if DEBUG_DUMP:
+        cv2.imwrite(filename, image)
+
+def preprocess_image(img):
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    processed_image_path = 'processed_image.jpg'
-    cv2.imwrite(processed_image_path, binary)
-    return processed_image_path
+    debug_dump('processed_image.png', binary)
+    return binary
 
-def extract_text_from_image(image_path):
-    i = Image.open(image_path)
-    txt = tess.image_to_string(i)
+def extract_text_from_image(image):
+    txt = image_to_string(image)
     return txt
 
 def create_gui():
@@ -79,6 +96,9 @@ def create_gui():
     capture_button = Button(root, text="Capture Image from Webcam", command=capture_and_process)
     capture_button.pack(pady=5)
 
+    live_button = Button(root, text="Live Capture (auto)", command=live_capture_and_process)
+    live_button.pack(pady=5)
+
     upload_button = Button(root, text="Upload File", command=select_file)
     upload_button.pack(pady=5)
 
@@ -88,10 +108,19 @@ def create_gui():
     root.mainloop()
 
 def capture_and_process():
-    image_path = capture_image()
-    if image_path:
-        processed_image_path = preprocess_image(image_path)
-        extracted_text = extract_text_from_image(processed_image_path)
+    image = capture_image()
+    if image is not None:
+        processed_image = preprocess_image(image)
+        extracted_text = extract_text_from_image(processed_image)
+        text_display.delete('1.0', 'end')
+        text_display.insert('1.0', extracted_text)
+
+def live_capture_and_process():
+    def process(frame):
+        return extract_text_from_image(preprocess_image(frame))
+
+    extracted_text = run_live_capture(process, accept=lambda text: bool(text.strip()))
+    if extracted_text is not None:
         text_display.delete('1.0', 'end')
         text_display.insert('1.0', extracted_text)
 